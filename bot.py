@@ -6,8 +6,13 @@
 """
 
 import os
+import random
+import time
 import asyncio
-from typing import Optional
+import contextlib
+import functools
+from typing import Awaitable, Callable, Optional, Sequence
+from dataclasses import dataclass, field
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -24,6 +29,8 @@ from config import (
     MESSAGES,
     ROLE_DESCRIPTIONS,
     DISCUSSION_TIME,
+    GAME_IDLE_TIMEOUT,
+    GAME_SWEEP_INTERVAL,
 )
 from game.models import Role, GamePhase, GameState, Player
 from game.logic import (
@@ -46,21 +53,27 @@ from game.logic import (
     is_night_phase_complete,
 )
 from game.llm_player import (
-    get_next_llm_character,
+    get_next_llm_characters,
     reset_character_selection,
     llm_seer_action,
     llm_thief_action,
     llm_hunter_action,
     llm_hunter_revenge_action,
     llm_vote,
+    llm_combined_agent_plan,
     llm_generate_discussion_message,
     get_xai_api_key,
+    close_http_client,
 )
 
 # 環境変数の読み込み
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_ID = os.getenv("GUILD_ID")  # テスト用サーバーのID（オプション）
+# 起動時にスラッシュコマンドを同期するか（オプション。通常はBotオーナーが !sync で同期する）
+SYNC_COMMANDS_ON_STARTUP = os.getenv("SYNC_COMMANDS_ON_STARTUP", "").lower() in ("1", "true", "yes")
+# 時間のかかるコマンド処理（/onj begin の役職DM送信）の同時実行数（オプション）
+MAX_CONCURRENT_COMMANDS = int(os.getenv("MAX_CONCURRENT_COMMANDS", "4"))
 
 if not TOKEN:
     raise ValueError("DISCORD_TOKEN が設定されていません。.env ファイルを確認してください。")
@@ -70,29 +83,85 @@ if not TOKEN:
 # Bot設定
 # =============================================================================
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.dm_messages = True
-intents.members = True
+# 必要なイベントだけを受け取る（membersは不要: DM送信はfetch_userで補う）
+intents = discord.Intents.none()
+intents.guilds = True               # スラッシュコマンド・チャンネル情報
+intents.guild_messages = True       # 議論フェーズの発言
+intents.dm_messages = True          # !seer / !thief / !hunter のDM入力
+intents.message_content = True      # 上記メッセージの本文を読むために必要
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# プレフィックスコマンド（!sync とDMでの !seer / !thief / !hunter）の接頭辞
+COMMAND_PREFIX = "!"
+
+bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
 
 # チャンネルごとのゲーム状態を管理
 # channel_id -> GameState
 games: dict[int, GameState] = {}
 
+# バックグラウンドで進行中のタスク（イベントループは弱参照しか持たないため、終わるまでここで保持する）
+_background_tasks: set[asyncio.Task] = set()
+
+# ゲーム中に取得したDiscordユーザー（夜・処刑時のDMで再取得しないため）
+# channel_id -> (user_id -> User)
+_user_cache: dict[int, dict[int, discord.User]] = {}
+
+# 議論フェーズ中のチャンネル（on_messageで無関係なメッセージを素早く捨てるため）
+_active_discussion_channels: set[int] = set()
+
+# フェーズの表示名
+PHASE_NAMES: dict[GamePhase, str] = {
+    GamePhase.WAITING: "参加募集中",
+    GamePhase.NIGHT: "夜フェーズ",
+    GamePhase.DISCUSSION: "議論フェーズ",
+    GamePhase.VOTING: "投票フェーズ",
+    GamePhase.ENDED: "終了",
+}
+
+# 役職構成が人数と合わない場合の警告
+ROLE_CONFIG_WARNING = "\n⚠️ 役職構成の調整が必要です（`/onj roles` で変更してください）"
+
+# 差し込む値が固定のメッセージは起動時に展開しておく
+TOO_MANY_PLAYERS_MESSAGE = MESSAGES["too_many_players"].format(max=MAX_PLAYERS)
+ROLE_NOTIFICATION_MESSAGES: dict[Role, str] = {
+    role: MESSAGES["role_notification"].format(
+        role=role.value,
+        description=ROLE_DESCRIPTIONS.get(role, "")
+    )
+    for role in Role
+}
+
 
 # =============================================================================
 # ユーティリティ関数
 # =============================================================================
 
+def get_role_config_warning(game: GameState) -> str:
+    """カスタム役職構成の枚数が人数と合わない場合の警告文を返す（問題なければ空文字）。"""
+    if game.custom_role_config is None or game.player_count == 0:
+        return ""
+    if len(game.custom_role_config) != game.player_count + CENTER_CARD_COUNT:
+        return ROLE_CONFIG_WARNING
+    return ""
+
+
 def get_game(channel_id: int) -> Optional[GameState]:
     """チャンネルのゲーム状態を取得する。"""
     return games.get(channel_id)
 
 
 def create_game(channel_id: int, host_id: int) -> GameState:
-    """新しいゲームを作成する。"""
+    """
+    新しいゲームを作成する。
+    
+    進行中のゲームが既にある場合は上書きせずにそれを返す。
+    終了済みのゲームは新しいゲームで置き換える。
+    """
+    state = games.get(channel_id)
+    if state is not None and state.phase != GamePhase.ENDED:
+        return state
+    if state is not None:
+        _user_cache.pop(channel_id, None)
     state = GameState(channel_id=channel_id, host_id=host_id)
     games[channel_id] = state
     return state
@@ -102,47 +171,193 @@ def end_game(channel_id: int) -> None:
     """ゲームを終了し、状態を削除する。"""
     if channel_id in games:
         del games[channel_id]
+    _user_cache.pop(channel_id, None)
+    _active_discussion_channels.discard(channel_id)
+
+
+def sweep_idle_games() -> list[int]:
+    """
+    一定時間操作のないゲームを破棄する。
+    
+    Returns:
+        破棄したゲームのチャンネルIDリスト
+    """
+    now = datetime.now()
+    stale_ids = [
+        channel_id for channel_id, game in games.items()
+        if (now - game.last_activity).total_seconds() > GAME_IDLE_TIMEOUT
+    ]
+    for channel_id in stale_ids:
+        end_game(channel_id)
+    return stale_ids
+
+
+async def game_sweeper_loop() -> None:
+    """放置ゲームを定期的に掃除するバックグラウンドタスク。"""
+    while True:
+        await asyncio.sleep(GAME_SWEEP_INTERVAL)
+        removed = sweep_idle_games()
+        if removed:
+            print(f"放置されたゲームを破棄しました: {len(removed)}件")
 
 
 def reset_game_keep_players(game: GameState) -> None:
     """ゲームをリセットし、参加者は保持する（再戦用）。"""
-    from game.models import Role
-    
-    # 各プレイヤーの状態をリセット
     for player in game.players.values():
-        player.initial_role = Role.VILLAGER  # 仮の役職
-        player.current_role = Role.VILLAGER
-        player.night_action = None
-        player.has_acted = False
-        player.vote_target_id = None
-        player.my_statements.clear()  # 発言履歴をリセット
-    
-    # ゲーム状態をリセット
-    game.phase = GamePhase.WAITING
-    game.center_cards.clear()
-    game.current_night_role = None
-    game.night_action_order.clear()
-    game.night_action_index = 0
-    game.executed_player_ids.clear()
-    game.winners.clear()
-    game.discussion_history.clear()  # 議論履歴をリセット
+        player.reset()
+    game.reset_progress()
+
+
+# 役職DMの同時送信数の上限（DMのレート制限対策）
+ROLE_DM_CONCURRENCY = 5
+
+
+async def resolve_user(game: GameState, user_id: int) -> Optional[discord.User]:
+    """
+    User IDからユーザーを取得する（ゲーム中は取得結果を使い回す）。
+    
+    Returns:
+        ユーザー。見つからない場合はNone
+    """
+    cache = _user_cache.setdefault(game.channel_id, {})
+    user = cache.get(user_id) or bot.get_user(user_id)
+    if user is None:
+        try:
+            user = await bot.fetch_user(user_id)
+        except discord.HTTPException as e:
+            print(f"ユーザー取得エラー ({user_id}): {e}")
+            return None
+    cache[user_id] = user
+    return user
+
+
+async def resolve_users(game: GameState, user_ids: list[int]) -> dict[int, discord.User]:
+    """
+    User IDからユーザーをまとめて取得する。
+    
+    キャッシュにないユーザーはfetch_userを並列に実行して取得する。
+    見つからなかったユーザーは結果に含めない。
+    """
+    cache = _user_cache.setdefault(game.channel_id, {})
+    users: dict[int, discord.User] = {}
+    missing: list[int] = []
+    for user_id in user_ids:
+        user = cache.get(user_id) or bot.get_user(user_id)
+        if user is None:
+            missing.append(user_id)
+        else:
+            users[user_id] = user
+    
+    if missing:
+        fetched = await asyncio.gather(
+            *(bot.fetch_user(user_id) for user_id in missing),
+            return_exceptions=True
+        )
+        for user_id, result in zip(missing, fetched):
+            if isinstance(result, Exception):
+                print(f"ユーザー取得エラー ({user_id}): {result}")
+            else:
+                users[user_id] = result
+    cache.update(users)
+    return users
+
+
+# DMでの行動入力（!seer / !thief / !hunter）を待っているプレイヤーの受信キュー
+# user_id -> キュー（on_messageから振り分ける）
+_dm_inboxes: dict[int, asyncio.Queue] = {}
+
+
+def open_dm_inbox(user_ids: frozenset[int]) -> asyncio.Queue:
+    """指定したプレイヤーからのDMを受け取るキューを登録する。"""
+    inbox: asyncio.Queue = asyncio.Queue()
+    for user_id in user_ids:
+        _dm_inboxes[user_id] = inbox
+    return inbox
+
+
+def close_dm_inbox(user_ids: frozenset[int], inbox: asyncio.Queue) -> None:
+    """open_dm_inboxで登録したキューを解除する。"""
+    for user_id in user_ids:
+        if _dm_inboxes.get(user_id) is inbox:
+            del _dm_inboxes[user_id]
+
+
+async def next_dm(inbox: asyncio.Queue, check: Callable[[discord.Message], bool]) -> discord.Message:
+    """キューからcheckを満たす次のDMを取り出す。"""
+    while True:
+        message = await inbox.get()
+        if check(message):
+            return message
 
 
 async def send_role_dm(user: discord.User, player: Player) -> bool:
     """プレイヤーにDMで役職を通知する。"""
     try:
-        role = player.initial_role
-        description = ROLE_DESCRIPTIONS.get(role, "")
-        message = MESSAGES["role_notification"].format(
-            role=role.value,
-            description=description
-        )
-        await user.send(message)
+        await user.send(ROLE_NOTIFICATION_MESSAGES[player.initial_role])
         return True
     except discord.Forbidden:
         return False
 
 
+# =============================================================================
+# インタラクション応答
+# =============================================================================
+
+# Discordのインタラクション応答期限（3秒）に対する警告しきい値（ミリ秒）
+ACK_BUDGET_MS = 2500
+
+# 時間のかかるコマンド処理（/onj begin の役職DM送信）の同時実行数を制限（イベントループの混雑でハートビートが遅れないように）
+_command_semaphore = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+
+
+def command_handler(func):
+    """
+    スラッシュコマンドの共通処理を行うデコレータ（ゲームの最終操作日時を更新する）。
+
+    入力チェックで弾く応答は本人のみに見せたいため、ここでは defer しない。
+    時間のかかる処理は acknowledge() の中で行う。
+    """
+    @functools.wraps(func)
+    async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+        game = games.get(interaction.channel_id)
+        if game is not None:
+            game.touch()
+        await func(self, interaction, *args, **kwargs)
+    return wrapper
+
+
+async def reply(interaction: discord.Interaction, content: str, **kwargs) -> None:
+    """
+    インタラクションに返信する。
+
+    まだ応答していなければ直接応答し（ephemeral=True なら本人のみに表示）、
+    acknowledge() で保留済みならフォローアップとして送る。
+    """
+    if interaction.response.is_done():
+        await interaction.followup.send(content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
+
+
+@contextlib.asynccontextmanager
+async def acknowledge(interaction: discord.Interaction):
+    """
+    応答を保留（defer）してから、コマンドの処理枠の中で重い処理を行う。
+
+    Discordは3秒以内の応答を要求するため、DM送信などの時間のかかる処理は
+    入力チェックを通った後、このブロックの中で行う（保留後の返信は公開される）。
+    """
+    ack_started = time.monotonic()
+    await interaction.response.defer()
+    ack_ms = (time.monotonic() - ack_started) * 1000
+    if ack_ms > ACK_BUDGET_MS:
+        print(f"Warning: コマンドの応答保留に {ack_ms:.0f}ms かかりました")
+    if _command_semaphore.locked():
+        print(f"コマンドの処理枠の空き待ちです（上限 {MAX_CONCURRENT_COMMANDS}）")
+    async with _command_semaphore:
+        yield
+
+
 # =============================================================================
 # スラッシュコマンドグループ
 # =============================================================================
@@ -154,18 +369,20 @@ class OnenightCommands(app_commands.Group):
         super().__init__(name="onj", description="ワンナイト人狼のコマンド")
     
     @app_commands.command(name="start", description="ゲームの参加者募集を開始する")
+    @command_handler
     async def start(self, interaction: discord.Interaction) -> None:
         """ゲームの募集を開始する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
         # 既存のゲームがあるか確認
-        existing_game = get_game(channel_id)
+        existing_game = games.get(channel_id)
         if existing_game and existing_game.phase != GamePhase.ENDED:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["game_already_running"],
                 ephemeral=True
             )
@@ -175,7 +392,8 @@ class OnenightCommands(app_commands.Group):
         game = create_game(channel_id, interaction.user.id)
         game.add_player(interaction.user.id, interaction.user.display_name)
         
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"🐺 **ワンナイト人狼** の参加者を募集中！\n"
             f"`/onj join` で参加してください。\n"
             f"現在の参加者: 1人 ({interaction.user.display_name})\n\n"
@@ -184,71 +402,75 @@ class OnenightCommands(app_commands.Group):
         )
     
     @app_commands.command(name="join", description="ゲームに参加する")
+    @command_handler
     async def join(self, interaction: discord.Interaction) -> None:
         """ゲームに参加する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.WAITING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ 現在参加募集中のゲームがありません。`/onj start` で開始してください。",
                 ephemeral=True
             )
             return
         
         if game.player_count >= MAX_PLAYERS:
-            await interaction.response.send_message(
-                MESSAGES["too_many_players"].format(max=MAX_PLAYERS),
+            await reply(
+                interaction,
+                TOO_MANY_PLAYERS_MESSAGE,
                 ephemeral=True
             )
             return
         
         if not game.add_player(interaction.user.id, interaction.user.display_name):
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["already_joined"],
                 ephemeral=True
             )
             return
         
-        player_names = ", ".join(p.username for p in game.player_list)
+        player_names = game.player_names_display
         
         # カスタム役職構成がある場合の警告
-        warning = ""
-        if game.custom_role_config is not None:
-            required = game.player_count + CENTER_CARD_COUNT
-            if len(game.custom_role_config) != required:
-                warning = f"\n⚠️ 役職構成の調整が必要です（`/onj roles` で変更してください）"
+        warning = get_role_config_warning(game)
         
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"✅ {interaction.user.display_name} さんが参加しました！\n"
             f"現在の参加者: {game.player_count}人 ({player_names}){warning}"
         )
     
     @app_commands.command(name="leave", description="ゲームから離脱する")
+    @command_handler
     async def leave(self, interaction: discord.Interaction) -> None:
         """ゲームから離脱する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.WAITING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["wrong_phase"],
                 ephemeral=True
             )
             return
         
         if not game.remove_player(interaction.user.id):
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_in_game"],
                 ephemeral=True
             )
@@ -257,90 +479,82 @@ class OnenightCommands(app_commands.Group):
         # ホストが離脱した場合はゲームをキャンセル
         if interaction.user.id == game.host_id:
             end_game(channel_id)
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "❌ ホストが離脱したため、ゲームがキャンセルされました。"
             )
             return
         
-        player_names = ", ".join(p.username for p in game.player_list)
+        player_names = game.player_names_display
         
         # カスタム役職構成がある場合の警告
-        warning = ""
-        if game.custom_role_config is not None:
-            required = game.player_count + CENTER_CARD_COUNT
-            if len(game.custom_role_config) != required:
-                warning = f"\n⚠️ 役職構成の調整が必要です（`/onj roles` で変更してください）"
+        warning = get_role_config_warning(game)
         
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"❌ {interaction.user.display_name} さんが離脱しました。\n"
             f"現在の参加者: {game.player_count}人 ({player_names}){warning}"
         )
     
     @app_commands.command(name="players", description="現在の参加者を表示する")
+    @command_handler
     async def players(self, interaction: discord.Interaction) -> None:
         """現在の参加者を表示する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ このチャンネルでゲームは行われていません。",
                 ephemeral=True
             )
             return
         
-        player_list = "\n".join(
-            f"• {p.username}" + (" (ホスト)" if p.user_id == game.host_id else "")
-            for p in game.player_list
-        )
-        
-        phase_names = {
-            GamePhase.WAITING: "参加募集中",
-            GamePhase.NIGHT: "夜フェーズ",
-            GamePhase.DISCUSSION: "議論フェーズ",
-            GamePhase.VOTING: "投票フェーズ",
-            GamePhase.ENDED: "終了",
-        }
-        
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"📋 **参加者一覧** ({game.player_count}人)\n"
-            f"フェーズ: {phase_names.get(game.phase, '不明')}\n\n"
-            f"{player_list}",
+            f"フェーズ: {PHASE_NAMES.get(game.phase, '不明')}\n\n"
+            f"{game.players_display}",
             ephemeral=True
         )
     
     @app_commands.command(name="roles", description="役職構成を変更する（ホストのみ）")
+    @command_handler
     async def roles(self, interaction: discord.Interaction) -> None:
         """役職構成を変更する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.WAITING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ 参加募集中のゲームがありません。`/onj start` で開始してください。",
                 ephemeral=True
             )
             return
         
         if interaction.user.id != game.host_id:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_host"],
                 ephemeral=True
             )
             return
         
         if game.player_count < MIN_PLAYERS:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 f"⚠️ プレイヤーが{MIN_PLAYERS}人以上必要です。（現在{game.player_count}人）\n"
                 f"役職構成はプレイヤー人数が確定してから設定してください。",
                 ephemeral=True
@@ -349,46 +563,52 @@ class OnenightCommands(app_commands.Group):
         
         # 役職構成変更UIを表示
         view = RoleConfigView(game, interaction.user.id)
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             get_role_config_message(game),
             view=view
         )
     
     @app_commands.command(name="begin", description="ゲームを開始する（ホストのみ）")
+    @command_handler
     async def begin(self, interaction: discord.Interaction) -> None:
         """ゲームを開始する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.WAITING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["wrong_phase"],
                 ephemeral=True
             )
             return
         
         if interaction.user.id != game.host_id:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_host"],
                 ephemeral=True
             )
             return
         
         if game.player_count < MIN_PLAYERS:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_enough_players"].format(min=MIN_PLAYERS, current=game.player_count),
                 ephemeral=True
             )
             return
         
         if game.player_count > MAX_PLAYERS:
-            await interaction.response.send_message(
-                MESSAGES["too_many_players"].format(max=MAX_PLAYERS),
+            await reply(
+                interaction,
+                TOO_MANY_PLAYERS_MESSAGE,
                 ephemeral=True
             )
             return
@@ -402,69 +622,91 @@ class OnenightCommands(app_commands.Group):
             config_type = "デフォルト"
         
         if role_list is None:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 f"⚠️ {game.player_count}人用の役職構成が定義されていません。",
                 ephemeral=True
             )
             return
         
+        # 役職ごとの枚数と合計枚数を1回の走査で集計
+        role_counts: dict[Role, int] = {}
+        total_cards = 0
+        for role in role_list:
+            total_cards += 1
+            role_counts[role] = role_counts.get(role, 0) + 1
+        
         # 役職構成の枚数チェック
         required_cards = game.player_count + CENTER_CARD_COUNT
-        if len(role_list) != required_cards:
-            await interaction.response.send_message(
+        if total_cards != required_cards:
+            await reply(
+                interaction,
                 f"⚠️ 役職カードの枚数が不正です。\n"
-                f"必要: {required_cards}枚、現在: {len(role_list)}枚\n"
+                f"必要: {required_cards}枚、現在: {total_cards}枚\n"
                 f"`/onj roles` で役職構成を調整してください。",
                 ephemeral=True
             )
             return
         
-        # 役職構成を集計して表示用文字列を作成
-        role_counts = Counter(role.value for role in role_list)
+        # 表示用の役職構成文字列を作成
         role_composition = "、".join(
-            f"{role}×{count}" if count > 1 else role
+            f"{role.value}×{count}" if count > 1 else role.value
             for role, count in role_counts.items()
         )
         
-        await interaction.response.send_message(
-            f"🌙 **ゲームを開始します！**\n\n"
-            f"📋 **役職構成（{len(role_list)}枚・{config_type}）**\n"
-            f"{role_composition}\n"
-            f"（プレイヤー{game.player_count}人 + 中央カード{CENTER_CARD_COUNT}枚）\n\n"
-            f"各プレイヤーにDMで役職を通知します..."
-        )
-        
-        # ゲームをセットアップ
-        setup_game(game, role_list)
-        
-        # 各プレイヤーにDMで役職を通知（LLMプレイヤーはスキップ）
-        dm_failed: list[str] = []
-        for player in game.player_list:
-            # LLMプレイヤーはDMを送信しない
-            if player.is_llm:
-                continue
-            
-            user = bot.get_user(player.user_id)
-            if user is None:
-                try:
-                    user = await bot.fetch_user(player.user_id)
-                except discord.NotFound:
-                    dm_failed.append(player.username)
-                    continue
+        # 入力チェックを通ったので応答を保留し、役職DMの送信を行う
+        async with acknowledge(interaction):
+            await reply(
+                interaction,
+                f"🌙 **ゲームを開始します！**\n\n"
+                f"📋 **役職構成（{total_cards}枚・{config_type}）**\n"
+                f"{role_composition}\n"
+                f"（プレイヤー{game.player_count}人 + 中央カード{CENTER_CARD_COUNT}枚）\n\n"
+                f"各プレイヤーにDMで役職を通知します..."
+            )
             
-            success = await send_role_dm(user, player)
-            if not success:
-                dm_failed.append(player.username)
-        
-        if dm_failed:
-            if interaction.channel:
-                await interaction.channel.send(
-                    f"⚠️ 以下のプレイヤーにDMを送信できませんでした: {', '.join(dm_failed)}\n"
-                    f"DMを受け取れるよう設定を確認してください。"
+            try:
+                # ゲームをセットアップ
+                setup_game(game, role_list)
+                
+                # 各プレイヤーにDMで役職を通知（LLMプレイヤーはスキップ、並列送信）
+                human_players = game.get_human_players()
+                users = await resolve_users(game, [p.user_id for p in human_players])
+                dm_semaphore = asyncio.Semaphore(ROLE_DM_CONCURRENCY)
+                
+                async def notify_role(player: Player) -> bool:
+                    user = users.get(player.user_id)
+                    if user is None:
+                        return False
+                    async with dm_semaphore:
+                        return await send_role_dm(user, player)
+                
+                results = await asyncio.gather(
+                    *(notify_role(p) for p in human_players),
+                    return_exceptions=True
                 )
+                
+                dm_failed: list[str] = []
+                for player, result in zip(human_players, results):
+                    if isinstance(result, Exception):
+                        print(f"役職DM送信エラー ({player.username}): {result}")
+                        dm_failed.append(player.username)
+                    elif not result:
+                        dm_failed.append(player.username)
+                
+                if dm_failed:
+                    if interaction.channel:
+                        await interaction.channel.send(
+                            f"⚠️ 以下のプレイヤーにDMを送信できませんでした: {', '.join(dm_failed)}\n"
+                            f"DMを受け取れるよう設定を確認してください。"
+                        )
+            except Exception:
+                # 途中で失敗した場合はゲームを破棄（状態を残さない）
+                end_game(channel_id)
+                raise
         
-        # 夜フェーズを開始
-        await start_night_phase(interaction.channel, game)
+        # 夜フェーズ以降は長時間かかるため、コマンドの処理枠を占有しないようバックグラウンドで進行
+        spawn(run_game_phases(interaction.channel, game))
     
     async def vote_autocomplete(
         self,
@@ -476,44 +718,55 @@ class OnenightCommands(app_commands.Group):
         if channel_id is None:
             return []
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         if game is None or game.phase != GamePhase.VOTING:
             return []
         
         # 自分以外のゲーム参加者をフィルタリング
         choices = []
 
+        current_lower = current.lower()
+
         # 平和村オプションを最初に追加
-        if "平和" in current.lower() or current == "":
+        if "平和" in current_lower or current == "":
             choices.append(
                 app_commands.Choice(name="平和村", value="-1")
             )
 
-        for player in game.player_list:
-            if player.user_id == interaction.user.id:
-                continue  # 自分自身は除外
-            if current.lower() in player.username.lower():
-                choices.append(
-                    app_commands.Choice(name=player.username, value=str(player.user_id))
-                )
+        user_id = interaction.user.id
+        if current_lower:
+            choices.extend(
+                app_commands.Choice(name=player.username, value=str(player.user_id))
+                for name_lower, player in game.player_search_names
+                if player.user_id != user_id and current_lower in name_lower  # 自分自身は除外
+            )
+        else:
+            # 入力がない場合は絞り込みせず全員を候補にする
+            choices.extend(
+                app_commands.Choice(name=player.username, value=str(player.user_id))
+                for player in game.player_list
+                if player.user_id != user_id  # 自分自身は除外
+            )
 
         return choices[:25]  # Discord の上限は25件
     
     @app_commands.command(name="vote", description="プレイヤーに投票する")
     @app_commands.describe(player="投票先のプレイヤー")
     @app_commands.autocomplete(player=vote_autocomplete)
+    @command_handler
     async def vote(self, interaction: discord.Interaction, player: str) -> None:
         """プレイヤーに投票する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.VOTING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["wrong_phase"],
                 ephemeral=True
             )
@@ -521,14 +774,16 @@ class OnenightCommands(app_commands.Group):
         
         voter = game.get_player(interaction.user.id)
         if voter is None:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_in_game"],
                 ephemeral=True
             )
             return
         
         if voter.vote_target_id is not None:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["already_voted"],
                 ephemeral=True
             )
@@ -536,113 +791,107 @@ class OnenightCommands(app_commands.Group):
 
         # 平和村投票の処理
         if player == "-1":
-            voter.vote_target_id = -1
-            await interaction.response.send_message(
+            game.record_vote(voter, -1)
+            await reply(
+                interaction,
                 f"✅ {interaction.user.display_name} さんが投票しました。"
                 f"（{game.voted_count()}/{game.player_count}）"
             )
             if game.all_voted():
-                await end_voting_phase(interaction.channel, game)
+                spawn(run_end_voting_phase(interaction.channel, game))
             return
 
-        # player はユーザーIDの文字列
-        try:
-            target_id = int(player)
-        except ValueError:
-            # 名前で検索を試みる
-            target = None
-            for p in game.player_list:
-                if p.username.lower() == player.lower():
-                    target = p
-                    break
-            if target is None:
-                await interaction.response.send_message(
-                    MESSAGES["invalid_target"],
-                    ephemeral=True
-                )
-                return
-            target_id = target.user_id
-        
-        target = game.get_player(target_id)
+        # player はユーザーIDの文字列（名前を直接入力された場合は名前で検索）
+        target = game.resolve_vote_target(player)
         if target is None:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["invalid_target"],
                 ephemeral=True
             )
             return
         
-        if interaction.user.id == target_id:
-            await interaction.response.send_message(
+        if interaction.user.id == target.user_id:
+            await reply(
+                interaction,
                 MESSAGES["cannot_vote_self"],
                 ephemeral=True
             )
             return
         
-        if not register_vote(game, interaction.user.id, target_id):
-            await interaction.response.send_message(
+        if not register_vote(game, interaction.user.id, target.user_id):
+            await reply(
+                interaction,
                 "⚠️ 投票に失敗しました。",
                 ephemeral=True
             )
             return
         
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"✅ {interaction.user.display_name} さんが投票しました。"
             f"（{game.voted_count()}/{game.player_count}）"
         )
         
-        # 全員投票完了したら結果発表
+        # 全員投票完了したら結果発表（狩人の返答待ちがあるためバックグラウンドで実行）
         if game.all_voted():
-            await end_voting_phase(interaction.channel, game)
+            spawn(run_end_voting_phase(interaction.channel, game))
 
     @app_commands.command(name="cancel", description="ゲームをキャンセルする（ホストのみ）")
+    @command_handler
     async def cancel(self, interaction: discord.Interaction) -> None:
         """ゲームをキャンセルする。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ このチャンネルでゲームは行われていません。",
                 ephemeral=True
             )
             return
         
         if interaction.user.id != game.host_id:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_host"],
                 ephemeral=True
             )
             return
         
         end_game(channel_id)
-        await interaction.response.send_message("❌ ゲームがキャンセルされました。")
+        await reply(interaction, "❌ ゲームがキャンセルされました。")
     
     @app_commands.command(name="add_bot", description="AIプレイヤーを追加する（ホストのみ）")
     @app_commands.describe(count="追加するAIプレイヤーの人数（デフォルト: 1）")
+    @command_handler
     async def add_bot(self, interaction: discord.Interaction, count: int = 1) -> None:
         """AIプレイヤーを追加する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.WAITING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ 参加募集中のゲームがありません。`/onj start` で開始してください。",
                 ephemeral=True
             )
             return
         
         if interaction.user.id != game.host_id:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_host"],
                 ephemeral=True
             )
@@ -650,7 +899,8 @@ class OnenightCommands(app_commands.Group):
         
         # APIキーチェック
         if not get_xai_api_key():
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ XAI_API_KEY が設定されていません。\n"
                 ".env ファイルに `XAI_API_KEY=your_api_key` を追加してください。",
                 ephemeral=True
@@ -658,14 +908,16 @@ class OnenightCommands(app_commands.Group):
             return
         
         if count < 1 or count > 7:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ 追加できるAIプレイヤーは1〜7人です。",
                 ephemeral=True
             )
             return
         
         if game.player_count + count > MAX_PLAYERS:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 f"⚠️ プレイヤー数の上限は{MAX_PLAYERS}人です。"
                 f"（現在{game.player_count}人、追加可能: {MAX_PLAYERS - game.player_count}人）",
                 ephemeral=True
@@ -673,75 +925,66 @@ class OnenightCommands(app_commands.Group):
             return
         
         # AIプレイヤーを追加
-        existing_names = {p.username for p in game.player_list}
-        added_names = []
+        existing_names = {p.username for p in game.players.values()}
+        added_names: list[str] = []
 
-        # 既存LLMプレイヤーの最小ID（最も負の値）を取得
-        # 新規IDはこの値より小さくする（既存がなければ-1000から開始）
-        llm_players = game.get_llm_players()
-        if llm_players:
-            min_existing_id = min(p.user_id for p in llm_players)
-            base_id = min_existing_id - 1
-        else:
-            base_id = -1000
+        # 既存LLMプレイヤーの最小ID（最も負の値）より小さいIDを割り当てる
+        # （既存がなければ-1000から開始）
+        base_id = min((p.user_id for p in game.get_llm_players()), default=-999) - 1
 
-        for i in range(count):
-            # LLMプレイヤー用に負のIDを生成（重複しないように）
-            llm_id = base_id - i
+        # キャラクターをまとめて取得
+        characters = get_next_llm_characters(existing_names, count)
 
-            # キャラクターを取得
-            character = get_next_llm_character(existing_names)
+        for llm_id, character in zip(range(base_id, base_id - count, -1), characters):
             name = character["name"]
-            existing_names.add(name)
 
             # プレイヤー追加（失敗した場合はスキップ）
             if not game.add_player(llm_id, name, is_llm=True):
                 continue
 
             # キャラクター設定を割り当て
-            player = game.get_player(llm_id)
-            if player:
-                player.personality = character["personality"]
-                player.speech_style = character["speech_style"]
-                player.emoji = character["emoji"]
+            player = game.players[llm_id]
+            player.personality = character["personality"]
+            player.speech_style = character["speech_style"]
+            player.emoji = character["emoji"]
 
             added_names.append(f"{character['emoji']} {name}")
         
-        player_names = ", ".join(p.username for p in game.player_list)
+        player_names = game.player_names_display
         
         # カスタム役職構成がある場合の警告
-        warning = ""
-        if game.custom_role_config is not None:
-            required = game.player_count + CENTER_CARD_COUNT
-            if len(game.custom_role_config) != required:
-                warning = f"\n⚠️ 役職構成の調整が必要です（`/onj roles` で変更してください）"
+        warning = get_role_config_warning(game)
         
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"🤖 AIプレイヤーを追加しました: {', '.join(added_names)}\n"
             f"現在の参加者: {game.player_count}人 ({player_names}){warning}"
         )
     
     @app_commands.command(name="remove_bot", description="AIプレイヤーを削除する（ホストのみ）")
     @app_commands.describe(count="削除するAIプレイヤーの人数（デフォルト: 1、0で全削除）")
+    @command_handler
     async def remove_bot(self, interaction: discord.Interaction, count: int = 1) -> None:
         """AIプレイヤーを削除する。"""
         channel_id = interaction.channel_id
         
         if channel_id is None:
-            await interaction.response.send_message("このチャンネルでは使用できません。", ephemeral=True)
+            await reply(interaction, "このチャンネルでは使用できません。", ephemeral=True)
             return
         
-        game = get_game(channel_id)
+        game = games.get(channel_id)
         
         if game is None or game.phase != GamePhase.WAITING:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["wrong_phase"],
                 ephemeral=True
             )
             return
         
         if interaction.user.id != game.host_id:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 MESSAGES["not_host"],
                 ephemeral=True
             )
@@ -750,7 +993,8 @@ class OnenightCommands(app_commands.Group):
         llm_players = game.get_llm_players()
         
         if not llm_players:
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "⚠️ AIプレイヤーはいません。",
                 ephemeral=True
             )
@@ -767,21 +1011,19 @@ class OnenightCommands(app_commands.Group):
             game.remove_player(player.user_id)
             removed_names.append(player.username)
         
-        player_names = ", ".join(p.username for p in game.player_list) if game.player_count > 0 else "なし"
+        player_names = game.player_names_display if game.player_count > 0 else "なし"
         
         # カスタム役職構成がある場合の警告
-        warning = ""
-        if game.custom_role_config is not None and game.player_count > 0:
-            required = game.player_count + CENTER_CARD_COUNT
-            if len(game.custom_role_config) != required:
-                warning = f"\n⚠️ 役職構成の調整が必要です（`/onj roles` で変更してください）"
+        warning = get_role_config_warning(game)
         
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"🤖 AIプレイヤーを削除しました: {', '.join(removed_names)}\n"
             f"現在の参加者: {game.player_count}人 ({player_names}){warning}"
         )
     
     @app_commands.command(name="help", description="コマンド一覧と遊び方を表示する")
+    @command_handler
     async def help(self, interaction: discord.Interaction) -> None:
         """ヘルプを表示する。"""
         help_text = """🐺 **ワンナイト人狼 ヘルプ**
@@ -831,7 +1073,7 @@ class OnenightCommands(app_commands.Group):
 AIプレイヤーは Grok 4.1 Fast を使用し、役職に応じて
 自動で夜の行動と投票を行います。"""
         
-        await interaction.response.send_message(help_text, ephemeral=True)
+        await reply(interaction, help_text, ephemeral=True)
 
 
 # コマンドグループをBotに追加
@@ -858,43 +1100,65 @@ ROLE_EMOJI = {
     Role.MAYOR: "👑",
 }
 
+# 役職構成メッセージの各行の見出し（役職と「絵文字 役職名:」の組）
+ROLE_CONFIG_LINE_PREFIXES: tuple[tuple[Role, str], ...] = tuple(
+    (role, f"{ROLE_EMOJI.get(role, '')} {role.value}:") for role in AVAILABLE_ROLES
+)
 
-def get_role_config_message(game: GameState) -> str:
-    """現在の役職構成を表示するメッセージを生成する。"""
-    # 現在の役職構成を取得
-    if game.custom_role_config is not None:
-        role_list = game.custom_role_config
-        config_type = "カスタム"
-    else:
-        role_list = ROLE_CONFIG.get(game.player_count, [])
-        config_type = "デフォルト"
-    
-    # 役職をカウント
-    role_counts = Counter(role_list)
-    
-    lines = [f"📋 **役職構成**（{config_type}）"]
-    lines.append("")
-    
-    for role in AVAILABLE_ROLES:
-        count = role_counts.get(role, 0)
-        emoji = ROLE_EMOJI.get(role, "")
-        lines.append(f"{emoji} {role.value}: **{count}枚**")
-    
-    lines.append("")
-    lines.append(f"合計: **{len(role_list)}枚**（プレイヤー{game.player_count}人 + 中央{CENTER_CARD_COUNT}枚 = {game.player_count + CENTER_CARD_COUNT}枚必要）")
+
+# デフォルト構成の役職構成メッセージ（参加人数ごとに1度だけ作成）
+_default_role_config_messages: dict[int, str] = {}
+
+
+def format_role_config_message(config_type: str, role_counts: Counter, player_count: int) -> str:
+    """役職枚数から役職構成メッセージを組み立てる。"""
+    total = role_counts.total()
+    role_section = "\n".join(
+        f"{prefix} **{role_counts.get(role, 0)}枚**" for role, prefix in ROLE_CONFIG_LINE_PREFIXES
+    )
     
     # 枚数チェック
-    required = game.player_count + CENTER_CARD_COUNT
-    if len(role_list) != required:
-        diff = len(role_list) - required
-        if diff > 0:
-            lines.append(f"⚠️ {diff}枚多いです")
-        else:
-            lines.append(f"⚠️ {-diff}枚足りません")
+    required = player_count + CENTER_CARD_COUNT
+    diff = total - required
+    if diff > 0:
+        check_line = f"⚠️ {diff}枚多いです"
+    elif diff < 0:
+        check_line = f"⚠️ {-diff}枚足りません"
     else:
-        lines.append("✅ 枚数OK")
+        check_line = "✅ 枚数OK"
     
-    return "\n".join(lines)
+    return (
+        f"📋 **役職構成**（{config_type}）\n\n"
+        f"{role_section}\n\n"
+        f"合計: **{total}枚**（プレイヤー{player_count}人 + 中央{CENTER_CARD_COUNT}枚 = {required}枚必要）\n"
+        f"{check_line}"
+    )
+
+
+def get_role_config_message(game: GameState, role_counts: Optional[Counter] = None) -> str:
+    """
+    現在の役職構成を表示するメッセージを生成する。
+    
+    Args:
+        game: ゲーム状態
+        role_counts: 集計済みの役職枚数（RoleConfigViewから渡す。Noneならgameから集計）
+    """
+    player_count = game.player_count
+    
+    if game.custom_role_config is None and role_counts is None:
+        # デフォルト構成は参加人数だけで決まるので使い回す
+        message = _default_role_config_messages.get(player_count)
+        if message is None:
+            message = format_role_config_message(
+                "デフォルト", Counter(ROLE_CONFIG.get(player_count, [])), player_count
+            )
+            _default_role_config_messages[player_count] = message
+        return message
+    
+    config_type = "カスタム" if game.custom_role_config is not None else "デフォルト"
+    if role_counts is None:
+        role_counts = Counter(game.custom_role_config)
+    return format_role_config_message(config_type, role_counts, player_count)
 
 
 class RoleConfigView(discord.ui.View):
@@ -904,6 +1168,12 @@ class RoleConfigView(discord.ui.View):
         super().__init__(timeout=300)  # 5分でタイムアウト
         self.game = game
         self.host_id = host_id
+        # 編集中の役職枚数と、その元になった (構成の版数, 参加人数)
+        # （他のViewやリセットで構成が変わったら作り直す）
+        self._counts: Optional[Counter] = None
+        self._counts_key: Optional[tuple[int, int]] = None
+        # 表示用メッセージのキャッシュ（((構成の版数, 参加人数), 本文)）
+        self._cached_message: Optional[tuple[tuple[int, int], str]] = None
         self._add_buttons()
     
     def _add_buttons(self) -> None:
@@ -913,6 +1183,11 @@ class RoleConfigView(discord.ui.View):
         # 1行に3役職（6ボタン）は不可（1行5ボタンまで）
         # 解決策: 最初の4行に2役職ずつ（8役職）、最後の1行に1役職+リセット+完了
         
+        # ループ内で繰り返し参照するクラス・スタイルをローカルに束縛
+        Button = discord.ui.Button
+        add_style = discord.ButtonStyle.success
+        remove_style = discord.ButtonStyle.danger
+        
         for idx, role in enumerate(AVAILABLE_ROLES):
             # 最初の8役職は2役職/行で配置（row 0-3）
             # 最後の役職（idx=8）はrow 4に配置
@@ -922,9 +1197,9 @@ class RoleConfigView(discord.ui.View):
                 row = 4
             
             # 追加ボタン
-            add_btn = discord.ui.Button(
+            add_btn = Button(
                 label=f"+{role.value}",
-                style=discord.ButtonStyle.success,
+                style=add_style,
                 custom_id=f"add_{role.name}",
                 row=row,
             )
@@ -932,9 +1207,9 @@ class RoleConfigView(discord.ui.View):
             self.add_item(add_btn)
             
             # 削除ボタン
-            remove_btn = discord.ui.Button(
+            remove_btn = Button(
                 label=f"-{role.value}",
-                style=discord.ButtonStyle.danger,
+                style=remove_style,
                 custom_id=f"remove_{role.name}",
                 row=row,
             )
@@ -942,7 +1217,7 @@ class RoleConfigView(discord.ui.View):
             self.add_item(remove_btn)
         
         # リセットボタン（row 4、最後の役職と同じ行）
-        reset_btn = discord.ui.Button(
+        reset_btn = Button(
             label="🔄 リセット",
             style=discord.ButtonStyle.secondary,
             custom_id="reset",
@@ -952,7 +1227,7 @@ class RoleConfigView(discord.ui.View):
         self.add_item(reset_btn)
         
         # 完了ボタン（row 4、最後の役職と同じ行）
-        done_btn = discord.ui.Button(
+        done_btn = Button(
             label="✅ 完了",
             style=discord.ButtonStyle.primary,
             custom_id="done",
@@ -961,11 +1236,36 @@ class RoleConfigView(discord.ui.View):
         done_btn.callback = self._done_callback
         self.add_item(done_btn)
     
-    def _get_current_roles(self) -> list[Role]:
-        """現在の役職構成を取得する"""
-        if self.game.custom_role_config is not None:
-            return self.game.custom_role_config.copy()
-        return ROLE_CONFIG.get(self.game.player_count, []).copy()
+    def _get_counts(self) -> Counter:
+        """編集中の役職枚数を取得する（カスタム構成がなければデフォルト構成から作る）"""
+        game = self.game
+        key = (game.role_config_version, game.player_count)
+        if self._counts is None or self._counts_key != key:
+            if game.custom_role_config is None:
+                self._counts = Counter(ROLE_CONFIG.get(game.player_count, []))
+            else:
+                self._counts = Counter(game.custom_role_config)
+            self._counts_key = key
+        return self._counts
+    
+    def _apply_counts(self) -> None:
+        """編集中の役職枚数をゲームのカスタム構成に反映する"""
+        game = self.game
+        game.set_custom_role_config(list(self._get_counts().elements()))
+        self._counts_key = (game.role_config_version, game.player_count)
+    
+    def _current_message(self) -> str:
+        """表示用の役職構成メッセージを返す（構成の版数と参加人数が変わらなければ使い回す）"""
+        game = self.game
+        key = (game.role_config_version, game.player_count)
+        if self._cached_message is not None and self._cached_message[0] == key:
+            return self._cached_message[1]
+        if game.custom_role_config is None:
+            message = get_role_config_message(game)
+        else:
+            message = get_role_config_message(game, self._get_counts())
+        self._cached_message = (key, message)
+        return message
     
     def _make_add_callback(self, role: Role):
         """役職追加のコールバックを作成する"""
@@ -977,13 +1277,12 @@ class RoleConfigView(discord.ui.View):
                 )
                 return
             
-            # 現在の構成を取得して役職を追加
-            current = self._get_current_roles()
-            current.append(role)
-            self.game.custom_role_config = current
+            # 役職を1枚追加
+            self._get_counts()[role] += 1
+            self._apply_counts()
             
             await interaction.response.edit_message(
-                content=get_role_config_message(self.game),
+                content=self._current_message(),
                 view=self
             )
         return callback
@@ -998,14 +1297,14 @@ class RoleConfigView(discord.ui.View):
                 )
                 return
             
-            # 現在の構成を取得して役職を削除
-            current = self._get_current_roles()
-            if role in current:
-                current.remove(role)
-                self.game.custom_role_config = current
+            # 役職を1枚削除（0枚なら何もしない）
+            counts = self._get_counts()
+            if counts[role] > 0:
+                counts[role] -= 1
+                self._apply_counts()
             
             await interaction.response.edit_message(
-                content=get_role_config_message(self.game),
+                content=self._current_message(),
                 view=self
             )
         return callback
@@ -1019,10 +1318,10 @@ class RoleConfigView(discord.ui.View):
             )
             return
         
-        self.game.custom_role_config = None
+        self.game.set_custom_role_config(None)
         
         await interaction.response.edit_message(
-            content=get_role_config_message(self.game),
+            content=self._current_message(),
             view=self
         )
     
@@ -1036,11 +1335,12 @@ class RoleConfigView(discord.ui.View):
             return
         
         # 枚数チェック
-        role_list = self._get_current_roles()
+        role_counts = self._get_counts()
+        total = role_counts.total()
         required = self.game.player_count + CENTER_CARD_COUNT
         
-        if len(role_list) != required:
-            diff = len(role_list) - required
+        if total != required:
+            diff = total - required
             if diff > 0:
                 await interaction.response.send_message(
                     f"⚠️ 役職が{diff}枚多いです。調整してください。",
@@ -1057,10 +1357,9 @@ class RoleConfigView(discord.ui.View):
         self.stop()
         
         # 役職構成を表示用に整形
-        role_counts = Counter(r.value for r in role_list)
         role_composition = "、".join(
-            f"{r}×{c}" if c > 1 else r
-            for r, c in role_counts.items()
+            f"{r.value}×{c}" if c > 1 else r.value
+            for r, c in role_counts.items() if c > 0
         )
         
         await interaction.response.edit_message(
@@ -1073,24 +1372,91 @@ class RoleConfigView(discord.ui.View):
 # 夜フェーズ処理
 # =============================================================================
 
+def spawn(coro: Awaitable[None]) -> asyncio.Task:
+    """コルーチンをバックグラウンドで実行し、終わるまでタスクへの参照を保持する。"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def abort_game(channel: discord.abc.Messageable, game: GameState, error: Exception) -> None:
+    """進行中に失敗したゲームをチャンネルに知らせてから破棄する。"""
+    print(f"ゲーム進行エラー (channel {game.channel_id}): {error}")
+    # 既に別のゲームが始まっている場合は消さない
+    if get_game(game.channel_id) is not game:
+        return
+    end_game(game.channel_id)
+    try:
+        await channel.send(MESSAGES["game_error"])
+    except discord.HTTPException as e:
+        print(f"エラー通知の送信に失敗しました (channel {game.channel_id}): {e}")
+
+
+async def run_game_phases(channel: discord.abc.Messageable, game: GameState) -> None:
+    """夜フェーズから投票フェーズ開始までを進行する（失敗した場合はゲームを破棄）。"""
+    try:
+        await start_night_phase(channel, game)
+    except Exception as e:
+        await abort_game(channel, game, e)
+
+
+async def run_end_voting_phase(channel: discord.abc.Messageable, game: GameState) -> None:
+    """投票を締め切り、結果を発表する（失敗した場合はゲームを破棄）。"""
+    try:
+        await end_voting_phase(channel, game)
+    except Exception as e:
+        await abort_game(channel, game, e)
+
+
+# LLMの夜行動の判断を同時に問い合わせる上限（APIのレート制限対策）
+LLM_NIGHT_CONCURRENCY = 4
+
+
 async def start_night_phase(channel: discord.abc.Messageable, game: GameState) -> None:
     """夜フェーズを開始する。"""
     await channel.send(MESSAGES["night_start"])
     
-    # 人狼の行動
-    await process_werewolves(game)
+    # LLMの判断はほかの役職の結果に依存しないので先にまとめて問い合わせ、
+    # 結果の反映だけを夜の順番どおりに行う
+    llm_decisions = start_llm_night_decisions(game)
+    try:
+        # 行動順序（人狼 → 占い師 → 怪盗）に従って役職ごとの処理を呼ぶ
+        # （各処理は終わったら advance_night_phase で次の役職へ進める）
+        while (role := get_current_night_role(game)) is not None:
+            handler = NIGHT_HANDLERS.get(role)
+            if handler is None:
+                advance_night_phase(game)
+                continue
+            await handler(channel, game, llm_decisions)
+    finally:
+        # 途中で失敗した場合に残った問い合わせを止める
+        for task in llm_decisions.values():
+            task.cancel()
     
-    # 占い師の行動
-    await process_seers(channel, game)
+    # 昼フェーズへ
+    await start_day_phase(channel, game)
+
+
+def start_llm_night_decisions(game: GameState) -> dict[int, asyncio.Task]:
+    """
+    LLMの占い師・怪盗の行動判断（API呼び出し）を並列に開始する。
     
-    # 怪盗の行動
-    await process_thieves(channel, game)
+    Returns:
+        user_id -> 判断結果を返すタスク
+    """
+    semaphore = asyncio.Semaphore(LLM_NIGHT_CONCURRENCY)
     
-    # 狩人の行動
-    await process_hunters(channel, game)
+    async def decide(player: Player, action: Callable):
+        async with semaphore:
+            return await action(game, player, game.get_other_players(player.user_id))
     
-    # 昼フェーズへ
-    await start_day_phase(channel, game)
+    tasks: dict[int, asyncio.Task] = {}
+    for role, action in ((Role.SEER, llm_seer_action), (Role.THIEF, llm_thief_action)):
+        for player in game.get_players_by_initial_role(role):
+            if player.is_llm:
+                tasks[player.user_id] = asyncio.create_task(decide(player, action))
+    return tasks
 
 
 async def process_werewolves(game: GameState) -> None:
@@ -1106,12 +1472,9 @@ async def process_werewolves(game: GameState) -> None:
         if player.is_llm:
             continue
         
-        user = bot.get_user(user_id)
+        user = await resolve_user(game, user_id)
         if user is None:
-            try:
-                user = await bot.fetch_user(user_id)
-            except discord.NotFound:
-                continue
+            continue
         
         try:
             # 仲間の人狼情報
@@ -1134,8 +1497,12 @@ async def process_werewolves(game: GameState) -> None:
     advance_night_phase(game)
 
 
-async def process_seers(channel: discord.abc.Messageable, game: GameState) -> None:
-    """占い師の夜行動を処理する。"""
+async def process_seers(
+    channel: discord.abc.Messageable,
+    game: GameState,
+    llm_decisions: dict[int, asyncio.Task]
+) -> None:
+    """占い師の夜行動を処理する（LLMの判断は llm_decisions で開始済み）。"""
     seers = game.get_players_by_initial_role(Role.SEER)
     
     if not seers:
@@ -1146,24 +1513,15 @@ async def process_seers(channel: discord.abc.Messageable, game: GameState) -> No
     human_seers = [s for s in seers if not s.is_llm]
     llm_seers = [s for s in seers if s.is_llm]
     
-    # 人間プレイヤーにDMを送信
-    for seer in human_seers:
-        user = bot.get_user(seer.user_id)
+    # 人間プレイヤーにDMを送信（並列送信）
+    async def dm_seer(seer: Player) -> None:
+        user = await resolve_user(game, seer.user_id)
         if user is None:
-            try:
-                user = await bot.fetch_user(seer.user_id)
-            except discord.NotFound:
-                continue
+            return
         
         try:
             # 他プレイヤーのリストを作成
-            other_players = [
-                p for p in game.player_list 
-                if p.user_id != seer.user_id
-            ]
-            player_list = "\n".join(
-                f"• {p.username}" for p in other_players
-            )
+            other_players = game.get_other_players(seer.user_id)
             
             await user.send(
                 f"🔮 **占い師の行動**\n\n"
@@ -1177,10 +1535,11 @@ async def process_seers(channel: discord.abc.Messageable, game: GameState) -> No
         except discord.Forbidden:
             pass
     
+    await asyncio.gather(*(dm_seer(s) for s in human_seers), return_exceptions=True)
+    
     # LLMプレイヤーの行動を処理（並列実行）
     async def process_llm_seer(seer: Player) -> None:
-        other_players = [p for p in game.player_list if p.user_id != seer.user_id]
-        action_type, target_id = await llm_seer_action(game, seer, other_players)
+        action_type, target_id = await llm_decisions[seer.user_id]
         
         if action_type == "center":
             process_seer_action(game, seer.user_id, view_center=True)
@@ -1203,77 +1562,83 @@ async def process_seers(channel: discord.abc.Messageable, game: GameState) -> No
 
 async def wait_for_seer_actions(game: GameState, seers: list[Player]) -> None:
     """占い師の行動入力を待つ（全員が行動するまで待機）。"""
+    seer_ids = frozenset(s.user_id for s in seers)
     
     def check(message: discord.Message) -> bool:
+        # 安い判定から順に行う（無関係なメッセージはすぐに弾く）
         if message.guild is not None:  # DMのみ
             return False
-        if message.author.id not in [s.user_id for s in seers]:
+        if not message.content.startswith("!seer"):
             return False
-        player = game.get_player(message.author.id)
-        if player is None or player.has_acted:
+        if message.author.id not in seer_ids:
             return False
-        return message.content.startswith("!seer")
+        player = game.get_player(message.author.id)
+        return player is not None and not player.has_acted
     
     pending_seers = {s.user_id for s in seers}
     
-    while pending_seers:
-        try:
-            message = await bot.wait_for("message", check=check)
-        except asyncio.CancelledError:
-            break
-        
-        seer = game.get_player(message.author.id)
-        if seer is None:
-            continue
-        
-        parts = message.content.split()
-        if len(parts) < 2:
-            await message.channel.send("⚠️ 無効なコマンドです。`!seer player 名前` または `!seer center` を使用してください。")
-            continue
-        
-        action = parts[1].lower()
-        
-        if action == "center":
-            result = process_seer_action(game, seer.user_id, view_center=True)
-            if result:
-                await message.channel.send(result)
-                pending_seers.discard(seer.user_id)
-            else:
-                await message.channel.send("⚠️ 行動に失敗しました。")
-        
-        elif action == "player":
-            if len(parts) < 3:
-                await message.channel.send("⚠️ プレイヤー名を指定してください。")
-                continue
-            
-            target_name = " ".join(parts[2:])
-            target = None
-            for p in game.player_list:
-                if p.username.lower() == target_name.lower() or target_name.lower() in p.username.lower():
-                    target = p
-                    break
+    inbox = open_dm_inbox(seer_ids)
+    try:
+        while pending_seers:
+            try:
+                message = await next_dm(inbox, check)
+            except asyncio.CancelledError:
+                break
             
-            if target is None:
-                await message.channel.send(f"⚠️ プレイヤー '{target_name}' が見つかりません。")
+            seer = game.get_player(message.author.id)
+            if seer is None:
                 continue
             
-            if target.user_id == seer.user_id:
-                await message.channel.send("⚠️ 自分自身は占えません。")
+            parts = message.content.split()
+            if len(parts) < 2:
+                await message.channel.send("⚠️ 無効なコマンドです。`!seer player 名前` または `!seer center` を使用してください。")
                 continue
             
-            result = process_seer_action(game, seer.user_id, target_player_id=target.user_id)
-            if result:
-                await message.channel.send(result)
-                pending_seers.discard(seer.user_id)
+            action = parts[1].lower()
+            
+            if action == "center":
+                result = process_seer_action(game, seer.user_id, view_center=True)
+                if result:
+                    await message.channel.send(result)
+                    pending_seers.discard(seer.user_id)
+                else:
+                    await message.channel.send("⚠️ 行動に失敗しました。")
+            
+            elif action == "player":
+                if len(parts) < 3:
+                    await message.channel.send("⚠️ プレイヤー名を指定してください。")
+                    continue
+                
+                target_name = " ".join(parts[2:])
+                target = game.find_player_by_name(target_name)
+                
+                if target is None:
+                    await message.channel.send(f"⚠️ プレイヤー '{target_name}' が見つかりません。")
+                    continue
+                
+                if target.user_id == seer.user_id:
+                    await message.channel.send("⚠️ 自分自身は占えません。")
+                    continue
+                
+                result = process_seer_action(game, seer.user_id, target_player_id=target.user_id)
+                if result:
+                    await message.channel.send(result)
+                    pending_seers.discard(seer.user_id)
+                else:
+                    await message.channel.send("⚠️ 行動に失敗しました。")
+            
             else:
-                await message.channel.send("⚠️ 行動に失敗しました。")
-        
-        else:
-            await message.channel.send("⚠️ 無効なコマンドです。`!seer player 名前` または `!seer center` を使用してください。")
+                await message.channel.send("⚠️ 無効なコマンドです。`!seer player 名前` または `!seer center` を使用してください。")
+    finally:
+        close_dm_inbox(seer_ids, inbox)
 
 
-async def process_thieves(channel: discord.abc.Messageable, game: GameState) -> None:
-    """怪盗の夜行動を処理する。"""
+async def process_thieves(
+    channel: discord.abc.Messageable,
+    game: GameState,
+    llm_decisions: dict[int, asyncio.Task]
+) -> None:
+    """怪盗の夜行動を処理する（LLMの判断は llm_decisions で開始済み）。"""
     thieves = game.get_players_by_initial_role(Role.THIEF)
     
     if not thieves:
@@ -1284,20 +1649,14 @@ async def process_thieves(channel: discord.abc.Messageable, game: GameState) ->
     human_thieves = [t for t in thieves if not t.is_llm]
     llm_thieves = [t for t in thieves if t.is_llm]
     
-    # 人間プレイヤーにDMを送信
-    for thief in human_thieves:
-        user = bot.get_user(thief.user_id)
+    # 人間プレイヤーにDMを送信（並列送信）
+    async def dm_thief(thief: Player) -> None:
+        user = await resolve_user(game, thief.user_id)
         if user is None:
-            try:
-                user = await bot.fetch_user(thief.user_id)
-            except discord.NotFound:
-                continue
+            return
         
         try:
-            other_players = [
-                p for p in game.player_list 
-                if p.user_id != thief.user_id
-            ]
+            other_players = game.get_other_players(thief.user_id)
             
             await user.send(
                 f"🦹 **怪盗の行動**\n\n"
@@ -1311,10 +1670,11 @@ async def process_thieves(channel: discord.abc.Messageable, game: GameState) ->
         except discord.Forbidden:
             pass
     
+    await asyncio.gather(*(dm_thief(t) for t in human_thieves), return_exceptions=True)
+    
     # LLMプレイヤーの行動を処理
     async def process_llm_thief(thief: Player) -> None:
-        other_players = [p for p in game.player_list if p.user_id != thief.user_id]
-        target_id = await llm_thief_action(game, thief, other_players)
+        target_id = await llm_decisions[thief.user_id]
         process_thief_action(game, thief.user_id, target_id=target_id)
     
     llm_tasks = [process_llm_thief(thief) for thief in llm_thieves]
@@ -1333,66 +1693,68 @@ async def process_thieves(channel: discord.abc.Messageable, game: GameState) ->
 
 async def wait_for_thief_actions(game: GameState, thieves: list[Player]) -> None:
     """怪盗の行動入力を待つ（全員が行動するまで待機）。"""
+    thief_ids = frozenset(t.user_id for t in thieves)
     
     def check(message: discord.Message) -> bool:
+        # 安い判定から順に行う（無関係なメッセージはすぐに弾く）
         if message.guild is not None:
             return False
-        if message.author.id not in [t.user_id for t in thieves]:
+        if not message.content.startswith("!thief"):
             return False
-        player = game.get_player(message.author.id)
-        if player is None or player.has_acted:
+        if message.author.id not in thief_ids:
             return False
-        return message.content.startswith("!thief")
+        player = game.get_player(message.author.id)
+        return player is not None and not player.has_acted
     
     pending_thieves = {t.user_id for t in thieves}
     
-    while pending_thieves:
-        try:
-            message = await bot.wait_for("message", check=check)
-        except asyncio.CancelledError:
-            break
-        
-        thief = game.get_player(message.author.id)
-        if thief is None:
-            continue
-        
-        parts = message.content.split()
-        if len(parts) < 2:
-            await message.channel.send("⚠️ 無効なコマンドです。`!thief プレイヤー名` または `!thief skip` を使用してください。")
-            continue
-        
-        action = parts[1].lower()
-        
-        if action == "skip":
-            process_thief_action(game, thief.user_id, target_id=None)
-            await message.channel.send("🦹 何もしませんでした。あなたの役職は **怪盗** のままです。")
-            pending_thieves.discard(thief.user_id)
-        
-        else:
-            target_name = " ".join(parts[1:])
-            target = None
-            for p in game.player_list:
-                if p.username.lower() == target_name.lower() or target_name.lower() in p.username.lower():
-                    target = p
-                    break
+    inbox = open_dm_inbox(thief_ids)
+    try:
+        while pending_thieves:
+            try:
+                message = await next_dm(inbox, check)
+            except asyncio.CancelledError:
+                break
             
-            if target is None:
-                await message.channel.send(f"⚠️ プレイヤー '{target_name}' が見つかりません。")
+            thief = game.get_player(message.author.id)
+            if thief is None:
                 continue
             
-            if target.user_id == thief.user_id:
-                await message.channel.send("⚠️ 自分自身とは交換できません。")
+            parts = message.content.split()
+            if len(parts) < 2:
+                await message.channel.send("⚠️ 無効なコマンドです。`!thief プレイヤー名` または `!thief skip` を使用してください。")
                 continue
             
-            new_role = process_thief_action(game, thief.user_id, target_id=target.user_id)
-            if new_role:
-                await message.channel.send(
-                    f"🦹 {target.username} とカードを交換しました！\n"
-                    f"あなたの新しい役職は **{new_role.value}** です。"
-                )
+            action = parts[1].lower()
+            
+            if action == "skip":
+                process_thief_action(game, thief.user_id, target_id=None)
+                await message.channel.send("🦹 何もしませんでした。あなたの役職は **怪盗** のままです。")
                 pending_thieves.discard(thief.user_id)
+            
             else:
-                await message.channel.send("⚠️ 行動に失敗しました。")
+                target_name = " ".join(parts[1:])
+                target = game.find_player_by_name(target_name)
+                
+                if target is None:
+                    await message.channel.send(f"⚠️ プレイヤー '{target_name}' が見つかりません。")
+                    continue
+                
+                if target.user_id == thief.user_id:
+                    await message.channel.send("⚠️ 自分自身とは交換できません。")
+                    continue
+                
+                new_role = process_thief_action(game, thief.user_id, target_id=target.user_id)
+                if new_role:
+                    await message.channel.send(
+                        f"🦹 {target.username} とカードを交換しました！\n"
+                        f"あなたの新しい役職は **{new_role.value}** です。"
+                    )
+                    pending_thieves.discard(thief.user_id)
+                else:
+                    await message.channel.send("⚠️ 行動に失敗しました。")
+    finally:
+        close_dm_inbox(thief_ids, inbox)
 
 
 async def process_hunters(channel: discord.abc.Messageable, game: GameState) -> None:
@@ -1402,6 +1764,18 @@ async def process_hunters(channel: discord.abc.Messageable, game: GameState) ->
     advance_night_phase(game)
 
 
+# 夜の役職 -> 処理（引数は channel, game, llm_decisions にそろえる）
+NightHandler = Callable[
+    [discord.abc.Messageable, GameState, dict[int, asyncio.Task]], Awaitable[None]
+]
+NIGHT_HANDLERS: dict[Role, NightHandler] = {
+    Role.WEREWOLF: lambda channel, game, llm_decisions: process_werewolves(game),
+    Role.SEER: process_seers,
+    Role.THIEF: process_thieves,
+    Role.HUNTER: lambda channel, game, llm_decisions: process_hunters(channel, game),
+}
+
+
 # =============================================================================
 # 昼フェーズ処理
 # =============================================================================
@@ -1409,6 +1783,8 @@ async def process_hunters(channel: discord.abc.Messageable, game: GameState) ->
 async def start_day_phase(channel: discord.abc.Messageable, game: GameState) -> None:
     """昼フェーズ（議論）を開始する。"""
     game.phase = GamePhase.DISCUSSION
+    game.touch()
+    _active_discussion_channels.add(game.channel_id)
 
     await channel.send(
         f"☀️ **朝になりました！**\n\n"
@@ -1420,7 +1796,7 @@ async def start_day_phase(channel: discord.abc.Messageable, game: GameState) ->
     # LLMプレイヤーの初回発言（順番に1回ずつ）と自動発言ループを開始
     llm_players = game.get_llm_players()
     if llm_players:
-        asyncio.create_task(initial_then_auto_speak(channel, game))
+        spawn(initial_then_auto_speak(channel, game))
 
     # 議論時間を待つ
     await asyncio.sleep(DISCUSSION_TIME)
@@ -1432,6 +1808,13 @@ async def start_day_phase(channel: discord.abc.Messageable, game: GameState) ->
 async def start_voting_phase(channel: discord.abc.Messageable, game: GameState) -> None:
     """投票フェーズを開始する。"""
     game.phase = GamePhase.VOTING
+    game.touch()
+    _active_discussion_channels.discard(game.channel_id)
+    
+    # 待機中の自動発言ループを終了させる
+    state = _speak_states.get(game.channel_id)
+    if state is not None:
+        state.wakeup.set()
     
     player_list = "\n".join(f"• {p.username}" for p in game.player_list)
     
@@ -1447,53 +1830,81 @@ async def start_voting_phase(channel: discord.abc.Messageable, game: GameState)
     # LLMプレイヤーの自動投票（少し遅延を入れてから投票）
     llm_players = game.get_llm_players()
     if llm_players:
-        asyncio.create_task(process_llm_votes(channel, game, llm_players))
+        spawn(process_llm_votes(channel, game, llm_players))
+
+
+# LLMの投票先を同時に問い合わせる上限（APIのレート制限対策）
+LLM_VOTE_CONCURRENCY = 4
 
 
 async def process_llm_votes(
     channel: discord.abc.Messageable,
     game: GameState,
-    llm_players: list[Player]
+    llm_players: Sequence[Player]
 ) -> None:
     """LLMプレイヤーの投票を処理する。"""
     # 自然な遅延（議論を見ているような演出）
     await asyncio.sleep(3)
     
-    for player in llm_players:
-        if game.phase != GamePhase.VOTING:
-            break
-        
+    if game.phase != GamePhase.VOTING:
+        return
+    
+    # 投票状況は1通のメッセージを編集して更新する（投票ごとに新しいメッセージを送らない）
+    def render_status() -> str:
+        lines = [
+            f"{p.emoji or '🤖'} {p.username}: {'✅ 投票済み' if p.vote_target_id is not None else '⏳ 考え中…'}"
+            for p in llm_players
+        ]
+        return (
+            f"🗳️ **ボットの投票状況**（{game.voted_count()}/{game.player_count}）\n"
+            + "\n".join(lines)
+        )
+    
+    status_message = await channel.send(render_status())
+    
+    # 投票先の決定は互いに独立しているため並列に問い合わせる
+    vote_semaphore = asyncio.Semaphore(LLM_VOTE_CONCURRENCY)
+    
+    async def decide(player: Player) -> int:
+        # 他のプレイヤー（自分以外）
+        other_players = game.get_other_players(player.user_id)
+        async with vote_semaphore:
+            if player.current_role != Role.HUNTER:
+                return await llm_vote(game, player, other_players)
+            # 狩人は処刑された場合の道連れ対象も同じ呼び出しで決めておく
+            plan = await llm_combined_agent_plan(game, player, other_players)
+            game.hunter_revenge_plans[player.user_id] = plan["revenge_target"]
+            return plan["vote"]
+    
+    pending_players = [p for p in llm_players if p.vote_target_id is None]
+    decisions = await asyncio.gather(*(decide(p) for p in pending_players))
+    
+    if game.phase != GamePhase.VOTING:
+        return
+    
+    # 投票の登録は参加順に行う
+    voted = False
+    for player, target_id in zip(pending_players, decisions):
         if player.vote_target_id is not None:
             continue  # 既に投票済み
         
-        # 他のプレイヤー（自分以外）
-        other_players = [p for p in game.player_list if p.user_id != player.user_id]
-        
-        # LLMに投票先を決定させる
-        target_id = await llm_vote(game, player, other_players)
-        
         # 投票を登録
-        emoji = player.emoji or "🤖"
         if target_id == -1:
-            player.vote_target_id = -1
-            await channel.send(
-                f"{emoji} {player.username} が投票しました。"
-                f"（{game.voted_count()}/{game.player_count}）"
-            )
-        else:
-            if register_vote(game, player.user_id, target_id):
-                await channel.send(
-                    f"{emoji} {player.username} が投票しました。"
-                    f"（{game.voted_count()}/{game.player_count}）"
-                )
-        
-        # 全員投票完了したら結果発表
-        if game.all_voted():
-            await end_voting_phase(channel, game)
-            break
-        
-        # 次のLLMプレイヤーの投票前に少し待つ
-        await asyncio.sleep(1)
+            game.record_vote(player, -1)
+            voted = True
+        elif register_vote(game, player.user_id, target_id):
+            voted = True
+    
+    # 投票状況の更新はまとめて1回だけ行う
+    if voted:
+        try:
+            await status_message.edit(content=render_status())
+        except discord.HTTPException as e:
+            print(f"投票状況の更新エラー: {e}")
+    
+    # 全員投票完了したら結果発表
+    if game.all_voted():
+        await run_end_voting_phase(channel, game)
 
 
 async def process_hunter_revenge(
@@ -1509,15 +1920,15 @@ async def process_hunter_revenge(
         game: ゲーム状態
         executed_hunters: 処刑される狩人のリスト
     """
-    import random
-
-    for hunter in executed_hunters:
+    # 複数の狩人が処刑される場合も、それぞれの選択を並行して待つ
+    async def handle_hunter(hunter: Player) -> None:
         # 道連れ対象候補（自分以外のプレイヤー）
-        candidates = [p for p in game.player_list if p.user_id != hunter.user_id]
+        candidates = game.get_other_players(hunter.user_id)
         if not candidates:
-            continue
+            return
 
         candidate_names = ", ".join(p.username for p in candidates)
+        candidate_names_lower = [(p.username.lower(), p) for p in candidates]
 
         await channel.send(
             f"🏹 **{hunter.username}** が処刑されます！\n\n"
@@ -1540,13 +1951,13 @@ async def process_hunter_revenge(
                 )
         else:
             # 人間プレイヤーの場合はDMで選択
-            user = bot.get_user(hunter.user_id)
+            user = await resolve_user(game, hunter.user_id)
             if user is None:
                 # ユーザーが見つからない場合はスキップ
                 await channel.send(
                     f"⚠️ {hunter.username} のユーザーが見つかりません。道連れはスキップされます。"
                 )
-                continue
+                return
 
             try:
                 dm_channel = await user.create_dm()
@@ -1567,10 +1978,12 @@ async def process_hunter_revenge(
                         and m.content.startswith("!hunter")
                     )
 
-                response = await bot.wait_for(
-                    "message",
-                    check=check
-                )
+                hunter_ids = frozenset((hunter.user_id,))
+                inbox = open_dm_inbox(hunter_ids)
+                try:
+                    response = await next_dm(inbox, check)
+                finally:
+                    close_dm_inbox(hunter_ids, inbox)
 
                 content = response.content.lower()
                 if "skip" in content:
@@ -1580,11 +1993,10 @@ async def process_hunter_revenge(
                     )
                 else:
                     # プレイヤー名を探す
-                    target = None
-                    for p in candidates:
-                        if p.username.lower() in response.content.lower():
-                            target = p
-                            break
+                    target = next(
+                        (p for name_lower, p in candidate_names_lower if name_lower in content),
+                        None
+                    )
 
                     if target:
                         add_hunter_target_to_execution(game, target.user_id)
@@ -1606,11 +2018,13 @@ async def process_hunter_revenge(
                     f"⚠️ {hunter.username} にDMを送れません。道連れはスキップされます。"
                 )
 
+    await asyncio.gather(*(handle_hunter(h) for h in executed_hunters))
+
 
 async def llm_hunter_revenge(
     game: GameState,
     hunter: Player,
-    candidates: list[Player]
+    candidates: Sequence[Player]
 ) -> Optional[Player]:
     """
     LLM狩人が道連れ対象を決定する。
@@ -1619,8 +2033,11 @@ async def llm_hunter_revenge(
     Returns:
         道連れ対象（基本的に必ず誰かを選ぶ）
     """
-    # 処刑時用の専用関数を使用（議論履歴・夜の情報を考慮）
-    target_id = await llm_hunter_revenge_action(game, hunter, candidates)
+    # 投票時に道連れ対象を決めてあればそれを使う（議論は投票前に終わっているため）
+    target_id = game.hunter_revenge_plans.pop(hunter.user_id, None)
+    if target_id is None:
+        # 処刑時用の専用関数を使用（議論履歴・夜の情報を考慮）
+        target_id = await llm_hunter_revenge_action(game, hunter, candidates)
 
     for p in candidates:
         if p.user_id == target_id:
@@ -1671,40 +2088,37 @@ async def end_voting_phase(channel: discord.abc.Messageable, game: GameState) ->
     vote_summary = "\n".join(vote_summary_lines) if vote_summary_lines else "（投票なし）"
 
     # 処刑対象を決定（狩人の道連れは含まない）
-    executed = determine_execution(game)
+    executed = determine_execution(game, vote_counts)
 
     # 狩人が処刑対象に含まれている場合、道連れ処理（投票結果表示前に発動）
     executed_hunters = get_executed_hunters(game)
     if executed_hunters:
         await process_hunter_revenge(channel, game, executed_hunters)
 
-    # 投票結果を表示（道連れ処理の後）
+    # 投票結果と処刑結果を表示（道連れ処理の後、1通にまとめて送信）
     await channel.send(
         f"📊 **投票結果**\n\n"
         f"**【投票内容】**\n{vote_details}\n\n"
-        f"**【得票数】**\n{vote_summary}"
+        f"**【得票数】**\n{vote_summary}\n\n"
+        f"{get_execution_message(game)}"
     )
 
-    # 処刑結果を表示
-    await channel.send(get_execution_message(game))
-
     # 勝敗を判定
     determine_winner(game)
     
-    # 勝者を発表
-    await channel.send(get_winner_message(game))
-    
-    # 最終役職を公開
-    await channel.send(
-        f"\n📋 **最終役職一覧**\n\n{get_final_roles_message(game)}"
-    )
+    # 勝者・最終役職は参加者の状態をリセットする前に作成する
+    winner_message = get_winner_message(game)
+    final_roles_message = get_final_roles_message(game)
     
     # ゲームをリセット（参加者は保持）
     reset_game_keep_players(game)
     
-    player_names = ", ".join(p.username for p in game.player_list)
+    # 勝者・最終役職・再戦案内を1通にまとめて送信
+    player_names = game.player_names_display
     await channel.send(
-        f"\n🎮 **ゲームが終了しました！**\n\n"
+        f"{winner_message}\n\n"
+        f"📋 **最終役職一覧**\n\n{final_roles_message}\n\n"
+        f"🎮 **ゲームが終了しました！**\n\n"
         f"**現在の参加者（{game.player_count}人）**: {player_names}\n\n"
         f"• `/onj begin` - 同じメンバーで再戦\n"
         f"• `/onj roles` - 役職構成を変更\n"
@@ -1717,6 +2131,12 @@ async def end_voting_phase(channel: discord.abc.Messageable, game: GameState) ->
 # イベントハンドラ
 # =============================================================================
 
+# 放置ゲーム掃除タスク
+_game_sweeper_task: Optional[asyncio.Task] = None
+# このプロセスでスラッシュコマンドを同期済みか
+_commands_synced = False
+
+
 @bot.event
 async def on_ready() -> None:
     """Bot起動時の処理。"""
@@ -1729,35 +2149,75 @@ async def on_ready() -> None:
     )
     await bot.change_presence(status=discord.Status.online, activity=activity)
     
-    # スラッシュコマンドを同期
+    # 放置ゲームの掃除タスクを開始（再接続時に重複起動しない）
+    global _game_sweeper_task
+    if _game_sweeper_task is None or _game_sweeper_task.done():
+        _game_sweeper_task = asyncio.create_task(game_sweeper_loop())
+    
+    # 起動時の同期は明示的に有効化された場合のみ、プロセスで1回だけ行う（再接続時は行わない）
+    global _commands_synced
+    if SYNC_COMMANDS_ON_STARTUP and not _commands_synced:
+        try:
+            await sync_app_commands()
+            _commands_synced = True
+        except Exception as e:
+            print(f"コマンド同期エラー: {e}")
+
+
+async def sync_app_commands() -> int:
+    """
+    スラッシュコマンドをDiscordに同期する。
+    
+    GUILD_ID が設定されていればそのギルドに同期し、グローバルコマンドはクリアする。
+    
+    Returns:
+        同期したコマンド数
+    """
+    if GUILD_ID:
+        guild = discord.Object(id=int(GUILD_ID))
+        
+        # ギルドのコマンドを一度クリアしてから再登録
+        bot.tree.clear_commands(guild=guild)
+        bot.tree.copy_global_to(guild=guild)
+        synced = await bot.tree.sync(guild=guild)
+        print(f"ギルド {GUILD_ID} にコマンドを同期しました: {len(synced)}個")
+        
+        # グローバルコマンドをクリア（重複防止）
+        bot.tree.clear_commands(guild=None)
+        await bot.tree.sync()
+        print("グローバルコマンドをクリアしました")
+    else:
+        # グローバルに同期（反映に最大1時間かかる）
+        synced = await bot.tree.sync()
+        print(f"グローバルにコマンドを同期しました: {len(synced)}個")
+    return len(synced)
+
+
+@bot.command(name="sync")
+@commands.is_owner()
+async def sync_cmd(ctx: commands.Context) -> None:
+    """スラッシュコマンドを同期する（Botオーナー専用。コマンド定義を変えたときに実行）。"""
+    global _commands_synced
     try:
-        if GUILD_ID:
-            guild = discord.Object(id=int(GUILD_ID))
-            
-            # ギルドのコマンドを一度クリアしてから再登録
-            bot.tree.clear_commands(guild=guild)
-            bot.tree.copy_global_to(guild=guild)
-            synced = await bot.tree.sync(guild=guild)
-            print(f"ギルド {GUILD_ID} にコマンドを同期しました: {len(synced)}個")
-            
-            # グローバルコマンドをクリア（重複防止）
-            bot.tree.clear_commands(guild=None)
-            await bot.tree.sync()
-            print("グローバルコマンドをクリアしました")
-        else:
-            # グローバルに同期（反映に最大1時間かかる）
-            synced = await bot.tree.sync()
-            print(f"グローバルにコマンドを同期しました: {len(synced)}個")
+        count = await sync_app_commands()
     except Exception as e:
         print(f"コマンド同期エラー: {e}")
+        await ctx.send(f"❌ コマンドの同期に失敗しました: {e}")
+        return
+    _commands_synced = True
+    target = f"ギルド {GUILD_ID}" if GUILD_ID else "グローバル"
+    await ctx.send(f"✅ {target} にスラッシュコマンドを {count}個 同期しました。")
 
 
 @bot.event
 async def on_command_error(ctx: commands.Context, error: commands.CommandError) -> None:
     """コマンドエラーのハンドラ。"""
-    # !seer, !thief, !hunter などはwait_forで処理するため、CommandNotFoundは無視
+    # !seer, !thief, !hunter などはDMの受信キューで処理するため、CommandNotFoundは無視
     if isinstance(error, commands.CommandNotFound):
         return
+    # オーナー以外の !sync は黙って無視する
+    if isinstance(error, commands.NotOwner):
+        return
     # その他のエラーは再送出
     raise error
 
@@ -1768,8 +2228,13 @@ async def on_message(message: discord.Message) -> None:
     if message.author.bot:
         return
     
-    # 議論フェーズ中のLLMプレイヤー発言処理
-    if message.guild is not None and message.channel is not None:
+    # 行動入力を待っているプレイヤーからのDMは待機中の処理へ渡す
+    if message.guild is None:
+        inbox = _dm_inboxes.get(message.author.id)
+        if inbox is not None:
+            inbox.put_nowait(message)
+    # 議論フェーズ中のLLMプレイヤー発言処理（議論中でないチャンネルはゲームを引かずに素通り）
+    elif message.channel.id in _active_discussion_channels:
         channel_id = message.channel.id
         game = get_game(channel_id)
         
@@ -1779,74 +2244,229 @@ async def on_message(message: discord.Message) -> None:
             if sender is not None and not sender.is_llm:
                 # 議論履歴に追加
                 game.add_discussion_message(sender.username, message.content)
+                
+                # 人間の発言直後はLLMの自発的発言を控える
+                postpone_auto_speak(channel_id, AUTO_SPEAK_QUIET_TIME)
 
                 # 名指しされたLLMプレイヤーがいれば発言させる
                 mentioned_llm = find_mentioned_llm(game, message.content)
                 if mentioned_llm:
-                    asyncio.create_task(
+                    spawn(
                         trigger_llm_discussion_for_player(
                             message.channel, game, message.content, mentioned_llm
                         )
                     )
     
-    await bot.process_commands(message)
+    # 接頭辞のない雑談はコマンド解析に回さない
+    if message.content.startswith(COMMAND_PREFIX):
+        await bot.process_commands(message)
 
 
-# 最後にLLMが発言した時間を記録（連続発言防止）
-_last_llm_speak_time: dict[int, float] = {}
-# 次に発言するLLMプレイヤーのインデックス（自動発言ループ用）
-_next_llm_speaker_index: dict[int, int] = {}
 # 自発的発言の間隔（秒）
 AUTO_SPEAK_INTERVAL = 10
+# 人間やLLMが発言した直後に自発的発言を控える時間（秒）
+AUTO_SPEAK_QUIET_TIME = 5
+# 議論開始時の初回発言を同時に生成する上限（APIのレート制限対策）
+INITIAL_STATEMENT_CONCURRENCY = 3
+# 生成途中のLLM発言を編集で反映する間隔（秒。Discordの編集レート制限に収まるように）
+STREAM_EDIT_INTERVAL = 1.5
+# 生成途中の発言の末尾に付ける印
+STREAMING_SUFFIX = " …"
+# 初回発言をまとめて投稿するときの1メッセージの上限文字数（Discordの上限2000文字に余裕を持たせる）
+BUNDLED_MESSAGE_LIMIT = 1900
+
+
+@dataclass
+class ChannelSpeakState:
+    """チャンネルごとのLLM発言状態（自動発言ループ用）。時刻は time.monotonic() の値。"""
+    last_speak: float = 0.0        # 最後にLLMが発言した時刻（連続発言防止）
+    next_deadline: float = 0.0     # 次に自発的発言をしてよい時刻
+    next_index: int = 0            # 次に発言するLLMプレイヤーのインデックス
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)  # 待ち時間の変更・フェーズ終了の通知
+
+
+# channel_id -> ChannelSpeakState
+_speak_states: dict[int, ChannelSpeakState] = {}
+
+
+def get_speak_state(channel_id: int) -> ChannelSpeakState:
+    """チャンネルのLLM発言状態を取得する（なければ作成）。"""
+    state = _speak_states.get(channel_id)
+    if state is None:
+        state = _speak_states[channel_id] = ChannelSpeakState()
+    return state
+
+
+def postpone_auto_speak(channel_id: int, delay: float) -> None:
+    """自発的発言を少なくともdelay秒後まで遅らせ、待機中のループに知らせる。"""
+    state = _speak_states.get(channel_id)
+    if state is None:
+        return  # LLMプレイヤーが発言していないチャンネル
+    state.next_deadline = max(state.next_deadline, time.monotonic() + delay)
+    state.wakeup.set()
+
+
+def record_llm_speak(channel_id: int) -> None:
+    """LLMが発言したことを記録する。"""
+    get_speak_state(channel_id).last_speak = time.monotonic()
+    postpone_auto_speak(channel_id, AUTO_SPEAK_QUIET_TIME)
 
 
 def find_mentioned_llm(game: GameState, content: str) -> Optional[Player]:
     """メッセージ内で名指しされたLLMプレイヤーを検出する。"""
-    llm_players = game.get_llm_players()
-    for player in llm_players:
-        if player.username in content:
-            return player
-    return None
+    return game.find_mentioned_llm(content)
+
+
+async def natural_delay(min_seconds: float, max_seconds: float) -> None:
+    """LLMの発言前に人間らしい間を空ける。"""
+    await asyncio.sleep(random.uniform(min_seconds, max_seconds))
+
+
+async def stream_llm_utterance(
+    channel: discord.abc.Messageable,
+    game: GameState,
+    speaker: Player,
+    context: str = ""
+) -> bool:
+    """
+    LLMプレイヤーの発言を生成しながら議論に投稿する。
+    
+    生成途中の本文は STREAM_EDIT_INTERVAL 秒ごとに送信・編集して見せ、
+    生成が終わったら完成した発言に置き換えて記録する。
+    
+    Returns:
+        発言を記録した場合True（生成に失敗した・議論フェーズが終わった場合はFalse）
+    """
+    partial = ""
+    done = asyncio.Event()
+    message: Optional[discord.Message] = None
+
+    def on_delta(text: str) -> None:
+        nonlocal partial
+        partial = text
+
+    async def show_progress() -> None:
+        nonlocal message
+        shown = ""
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), timeout=STREAM_EDIT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if done.is_set() or partial == shown or game.phase != GamePhase.DISCUSSION:
+                continue
+            shown = partial
+            content = format_llm_utterance(speaker, shown + STREAMING_SUFFIX)
+            try:
+                if message is None:
+                    message = await channel.send(content)
+                else:
+                    await message.edit(content=content)
+            except discord.HTTPException as e:
+                print(f"LLM発言の途中表示エラー ({speaker.username}): {e}")
+
+    # 送信・編集の途中で止めないよう、表示タスクは完了を知らせて自分で抜けさせる
+    progress = asyncio.create_task(show_progress())
+    try:
+        response = await llm_generate_discussion_message(
+            game, speaker, game.get_other_players(speaker.user_id), context, on_delta=on_delta
+        )
+    finally:
+        done.set()
+        await progress
+
+    if not response or game.phase != GamePhase.DISCUSSION:
+        # 途中まで表示した発言は取り消す
+        if message is not None:
+            try:
+                await message.delete()
+            except discord.HTTPException:
+                pass
+        return False
+
+    record_llm_utterance(game, speaker, response)
+    content = format_llm_utterance(speaker, response)
+    if message is None:
+        await channel.send(content)
+    else:
+        await message.edit(content=content)
+    return True
+
+
+def record_llm_utterance(game: GameState, speaker: Player, response: str) -> None:
+    """LLMプレイヤーの発言を議論履歴と自分の発言履歴に記録する。"""
+    record_llm_speak(game.channel_id)
+    game.add_discussion_message(speaker.username, response)
+    speaker.my_statements.append(response)
+
+
+def format_llm_utterance(speaker: Player, response: str) -> str:
+    """LLMプレイヤーの発言をチャンネルに投稿する形式にする。"""
+    emoji = speaker.emoji or "🤖"
+    return f"{emoji} **{speaker.username}**: {response}"
+
+
+def bundle_lines(lines: Sequence[str], limit: int = BUNDLED_MESSAGE_LIMIT) -> list[str]:
+    """行を順番を保ったまま、limit文字以内のメッセージにまとめる。"""
+    bundles: list[str] = []
+    current: list[str] = []
+    length = 0
+    for line in lines:
+        added = len(line) + (1 if current else 0)  # 改行1文字分
+        if current and length + added > limit:
+            bundles.append("\n".join(current))
+            current, length = [], 0
+            added = len(line)
+        current.append(line)
+        length += added
+    if current:
+        bundles.append("\n".join(current))
+    return bundles
 
 
 async def initial_llm_statements(
     channel: discord.abc.Messageable,
     game: GameState
 ) -> None:
-    """議論開始時に全LLMプレイヤーが順番に1回ずつ発言する。"""
-    import time
-    import random
-
+    """議論開始時に全LLMプレイヤーが1回ずつ発言する（順番どおりにまとめて投稿）。"""
     llm_players = game.get_llm_players()
     if not llm_players:
         return
 
-    for speaker in llm_players:
-        # 議論フェーズでない場合は中断
-        if game.phase != GamePhase.DISCUSSION:
-            break
+    # 初回発言はまとめて並列に生成する
+    semaphore = asyncio.Semaphore(INITIAL_STATEMENT_CONCURRENCY)
 
-        other_players = [p for p in game.player_list if p.user_id != speaker.user_id]
+    async def generate(speaker: Player) -> Optional[str]:
+        async with semaphore:
+            return await llm_generate_discussion_message(
+                game, speaker, game.get_other_players(speaker.user_id), ""
+            )
 
-        # 自然な遅延（2〜4秒）
-        await asyncio.sleep(random.uniform(2, 4))
+    responses = await asyncio.gather(
+        *(generate(speaker) for speaker in llm_players),
+        return_exceptions=True
+    )
 
-        # まだ議論フェーズか確認
-        if game.phase != GamePhase.DISCUSSION:
-            break
+    # 自然な遅延
+    await natural_delay(1, 2)
 
-        try:
-            response = await llm_generate_discussion_message(game, speaker, other_players, "")
-        except Exception as e:
-            print(f"LLM初回発言エラー ({speaker.username}): {e}")
+    # 議論フェーズでない場合は中断
+    if game.phase != GamePhase.DISCUSSION:
+        return
+
+    # 生成できた発言を記録し、まとめて投稿する（LLMの人数分の送信を1〜2回に減らす）
+    lines = []
+    for speaker, response in zip(llm_players, responses):
+        if isinstance(response, Exception):
+            print(f"LLM初回発言エラー ({speaker.username}): {response}")
+            continue
+        if not response:
             continue
+        record_llm_utterance(game, speaker, response)
+        lines.append(format_llm_utterance(speaker, response))
 
-        if response and game.phase == GamePhase.DISCUSSION:
-            _last_llm_speak_time[game.channel_id] = time.time()
-            game.add_discussion_message(speaker.username, response)
-            speaker.my_statements.append(response)
-            emoji = speaker.emoji or "🤖"
-            await channel.send(f"{emoji} **{speaker.username}**: {response}")
+    for bundle in bundle_lines(lines):
+        await channel.send(bundle)
 
 
 async def initial_then_auto_speak(
@@ -1863,60 +2483,50 @@ async def auto_llm_speak_loop(
     game: GameState
 ) -> None:
     """一定間隔でLLMプレイヤーに自発的に発言させる。"""
-    import time
-    import random
-
-    while game.phase == GamePhase.DISCUSSION:
-        # 最後の発言からの経過時間をチェック
-        current_time = time.time()
-        last_time = _last_llm_speak_time.get(game.channel_id, 0)
-
-        # 人間の発言があった直後はスキップ（重複防止）
-        if current_time - last_time < 5:
-            await asyncio.sleep(5)
-            continue
-
-        llm_players = game.get_llm_players()
-        if not llm_players:
-            break
-
-        # 順番にLLMプレイヤーを選択
-        current_index = _next_llm_speaker_index.get(game.channel_id, 0)
-        if current_index >= len(llm_players):
-            current_index = 0
-        speaker = llm_players[current_index]
-        _next_llm_speaker_index[game.channel_id] = (current_index + 1) % len(llm_players)
-        other_players = [p for p in game.player_list if p.user_id != speaker.user_id]
-
-        # 自然な遅延
-        await asyncio.sleep(random.uniform(1, 3))
-
-        # まだ議論フェーズか確認
-        if game.phase != GamePhase.DISCUSSION:
-            break
+    state = get_speak_state(game.channel_id)
+    try:
+        while game.phase == GamePhase.DISCUSSION:
+            # 次に発言してよい時刻まで待つ（発言があれば起こされて待ち時間を計算し直す）
+            wait = state.next_deadline - time.monotonic()
+            if wait > 0:
+                state.wakeup.clear()
+                try:
+                    await asyncio.wait_for(state.wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
 
-        # LLMに発言を生成させる
-        try:
-            response = await llm_generate_discussion_message(game, speaker, other_players, "")
-        except Exception as e:
-            print(f"LLM自発的発言エラー ({speaker.username}): {e}")
-            await asyncio.sleep(AUTO_SPEAK_INTERVAL)
-            continue
+            llm_players = game.get_llm_players()
+            if not llm_players:
+                break
 
-        if response and game.phase == GamePhase.DISCUSSION:
-            _last_llm_speak_time[game.channel_id] = time.time()
+            # 順番にLLMプレイヤーを選択
+            current_index = state.next_index
+            if current_index >= len(llm_players):
+                current_index = 0
+            speaker = llm_players[current_index]
+            state.next_index = (current_index + 1) % len(llm_players)
 
-            # 議論履歴に追加
-            game.add_discussion_message(speaker.username, response)
+            # 自然な遅延
+            await natural_delay(1, 3)
 
-            # 自分の発言履歴に追加
-            speaker.my_statements.append(response)
+            # まだ議論フェーズか確認
+            if game.phase != GamePhase.DISCUSSION:
+                break
 
-            emoji = speaker.emoji or "🤖"
-            await channel.send(f"{emoji} **{speaker.username}**: {response}")
+            # LLMに発言を生成させ、生成しながら投稿する
+            try:
+                await stream_llm_utterance(channel, game, speaker)
+            except Exception as e:
+                print(f"LLM自発的発言エラー ({speaker.username}): {e}")
+                state.next_deadline = time.monotonic() + AUTO_SPEAK_INTERVAL
+                continue
 
-        # 次の自発的発言まで待つ
-        await asyncio.sleep(AUTO_SPEAK_INTERVAL)
+            # 次の自発的発言まで待つ
+            state.next_deadline = max(state.next_deadline, time.monotonic() + AUTO_SPEAK_INTERVAL)
+    finally:
+        if _speak_states.get(game.channel_id) is state:
+            del _speak_states[game.channel_id]
 
 
 async def trigger_llm_discussion_for_player(
@@ -1926,56 +2536,49 @@ async def trigger_llm_discussion_for_player(
     speaker: Player
 ) -> None:
     """特定のLLMプレイヤーに議論で発言させる（名指しされた場合）。"""
-    import time
-    import random
-
     # 連続発言を防ぐため、最低3秒間隔を空ける
-    current_time = time.time()
-    last_time = _last_llm_speak_time.get(game.channel_id, 0)
-    if current_time - last_time < 3:
+    if time.monotonic() - get_speak_state(game.channel_id).last_speak < 3:
         return
 
     # 議論フェーズでない場合は何もしない
     if game.phase != GamePhase.DISCUSSION:
         return
 
-    # 他のプレイヤー
-    other_players = [p for p in game.player_list if p.user_id != speaker.user_id]
-
     # 少し待ってから発言（自然な遅延）
-    await asyncio.sleep(random.uniform(2, 4))
+    await natural_delay(2, 4)
 
     # まだ議論フェーズか確認
     if game.phase != GamePhase.DISCUSSION:
         return
 
-    # LLMに発言を生成させる
+    # LLMに発言を生成させ、生成しながら投稿する
     try:
-        response = await llm_generate_discussion_message(game, speaker, other_players, context)
+        await stream_llm_utterance(channel, game, speaker, context)
     except Exception as e:
         print(f"LLM議論発言エラー ({speaker.username}): {e}")
-        return  # 静かに失敗（ゲーム継続）
-
-    if response and game.phase == GamePhase.DISCUSSION:
-        _last_llm_speak_time[game.channel_id] = time.time()
-
-        # 議論履歴に追加
-        game.add_discussion_message(speaker.username, response)
-
-        # 自分の発言履歴に追加
-        speaker.my_statements.append(response)
-
-        emoji = speaker.emoji or "🤖"
-        await channel.send(f"{emoji} **{speaker.username}**: {response}")
+        # 静かに失敗（ゲーム継続）
 
 
 # =============================================================================
 # メイン
 # =============================================================================
 
+async def run_bot() -> None:
+    """Botを起動し、終了時に共有HTTPクライアントを閉じる。"""
+    try:
+        async with bot:
+            await bot.start(TOKEN)
+    finally:
+        await close_http_client()
+
+
 def main() -> None:
     """Botを起動する。"""
-    bot.run(TOKEN)
+    discord.utils.setup_logging()  # bot.run() と同じログ設定
+    try:
+        asyncio.run(run_bot())
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -134,6 +134,16 @@ CENTER_CARD_COUNT = 2
 # 昼フェーズの議論時間
 DISCUSSION_TIME = 180  # 3分
 
+# =============================================================================
+# ゲーム状態の掃除設定（秒）
+# =============================================================================
+
+# この時間操作がないゲームは破棄する（Bot長時間稼働時のメモリ対策）
+GAME_IDLE_TIMEOUT = 60 * 60  # 1時間
+
+# 放置ゲームを確認する間隔
+GAME_SWEEP_INTERVAL = 300  # 5分
+
 # =============================================================================
 # メッセージテンプレート
 # =============================================================================
@@ -176,6 +186,7 @@ MESSAGES = {
     "invalid_target": "⚠️ 無効な対象です。",
     "cannot_vote_self": "⚠️ 自分自身には投票できません。",
     "already_voted": "⚠️ 既に投票済みです。",
+    "game_error": "⚠️ ゲームの進行中にエラーが発生したため、ゲームを終了しました。`/onj start` で新しいゲームを始めてください。",
 }
 
 # =============================================================================
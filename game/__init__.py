@@ -13,12 +13,14 @@ from game.logic import (
 )
 from game.llm_player import (
     get_next_llm_character,
+    get_next_llm_characters,
     reset_character_selection,
     llm_seer_action,
     llm_thief_action,
     llm_hunter_action,
     llm_vote,
     get_xai_api_key,
+    close_http_client,
 )
 
 __all__ = [
@@ -37,11 +39,13 @@ __all__ = [
     "determine_winner",
     # LLM Player
     "get_next_llm_character",
+    "get_next_llm_characters",
     "reset_character_selection",
     "llm_seer_action",
     "llm_thief_action",
     "llm_hunter_action",
     "llm_vote",
     "get_xai_api_key",
+    "close_http_client",
 ]
 
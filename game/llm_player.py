@@ -8,13 +8,17 @@ Grok 4.1 Fast APIを使用してAIプレイヤーを実装する。
 import json
 import os
 import random
+import re
 import asyncio
 import ssl
 import time
+from collections import Counter
+from functools import lru_cache
+from importlib import resources
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, Sequence
 import httpx
-from game.models import Role, GameState, Player, NightActionType
+from game.models import Role, Team, GameState, Player, NightActionType, WOLF_ROLES, build_name_matcher, get_team
 
 
 def get_perceived_role(player: Player) -> Role:
@@ -30,11 +34,11 @@ def get_perceived_role(player: Player) -> Role:
 
 
 def load_rules_md() -> str:
-    """rules.mdファイルを読み込む。"""
-    rules_path = Path(__file__).parent / "rules.md"
-    if rules_path.exists():
-        return rules_path.read_text(encoding="utf-8")
-    return ""
+    """rules.mdファイルをパッケージのリソースとして読み込む（起動時に1回だけ呼ぶ）。"""
+    try:
+        return resources.files("game").joinpath("rules.md").read_text(encoding="utf-8")
+    except (FileNotFoundError, ModuleNotFoundError):
+        return ""
 
 
 def load_characters() -> list[dict]:
@@ -71,12 +75,41 @@ XAI_API_URL = "https://api.x.ai/v1/chat/completions"
 # 利用可能: grok-4-1-fast-reasoning, grok-4-1-fast-non-reasoning
 XAI_MODEL = os.getenv("XAI_MODEL", "grok-4-1-fast-reasoning")
 
-# API呼び出しレート制限
-API_CALL_INTERVAL = 1.0  # 最小呼び出し間隔（秒）
-_last_api_call_time: float = 0
+# API呼び出しレート制限（トークンバケット、環境変数で調整可能）
+API_RATE_LIMIT_PER_SEC = float(os.getenv("XAI_RATE_LIMIT_PER_SEC", "1.0"))  # 平均呼び出し回数/秒
+API_RATE_LIMIT_BURST = int(os.getenv("XAI_RATE_LIMIT_BURST", "3"))  # 連続で呼べる最大回数
+API_RETRY_AFTER_MAX = 30.0  # 429時に待つ最大秒数
+API_RETRY_BACKOFF_INITIAL = 0.5  # 最初のリトライまでの基準秒数
+API_RETRY_BACKOFF_MAX = 8.0  # リトライ間隔（指数バックオフ）の上限秒数
+API_MAX_ATTEMPTS = 4  # 1回の呼び出しで試す最大回数（初回を含む）
+
+# サーキットブレーカー: API呼び出しが続けて失敗したら、しばらく呼び出しを止める
+CIRCUIT_BREAKER_THRESHOLD = 5  # 遮断するまでの連続失敗回数
+CIRCUIT_BREAKER_COOL_OFF = 30.0  # 遮断する秒数
+_consecutive_failures = 0
+_circuit_open_until: float = 0.0
+
+# この人数未満のゲームでは、夜の行動（占い・交換・道連れの指名）をAPIに問い合わせずランダムに決める
+# （選択肢が少なく、問い合わせても結果がほとんど変わらないため）。0で無効
+LLM_NIGHT_FLOOR_PLAYERS = int(os.getenv("LLM_NIGHT_FLOOR_PLAYERS", "5"))
+
+# 処刑されたLLM狩人の道連れ判断を待つ最大秒数（超えたら議論履歴から決める）
+HUNTER_REVENGE_TIMEOUT = 8.0
+
+# プロンプトに含める議論履歴の件数（長いゲームでもトークン数を一定に保つ）
+DISCUSSION_CONTEXT_LIMIT = 15  # 議論中の発言生成
+DECISION_CONTEXT_LIMIT = 40  # 投票・狩人の道連れ判断
+
+# API呼び出しで使い回すHTTPクライアント（接続・TLSセッションを再利用する）
+# 接続数は複数ゲームが同時にLLMへ問い合わせても待たされない程度に確保する
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+HTTP_MAX_CONNECTIONS = 64
+_http_client: Optional[httpx.AsyncClient] = None
 
 # LLMキャラクター（characters.jsonから読み込み）
 LLM_CHARACTERS = load_characters()
+ALL_CHARACTER_INDICES = frozenset(range(len(LLM_CHARACTERS)))
+CHARACTER_INDEX_BY_NAME = {c["name"]: i for i, c in enumerate(LLM_CHARACTERS)}
 
 # 使用済みキャラクターのインデックス（ゲーム内で重複しないように）
 _used_character_indices: set[int] = set()
@@ -87,34 +120,55 @@ def get_xai_api_key() -> Optional[str]:
     return os.getenv("XAI_API_KEY")
 
 
+def get_character_indices(names: set[str]) -> set[int]:
+    """名前に一致するキャラクターのインデックスを返す。"""
+    return {CHARACTER_INDEX_BY_NAME[n] for n in names if n in CHARACTER_INDEX_BY_NAME}
+
+
 def get_next_llm_character(existing_names: set[str]) -> dict:
     """次のLLMキャラクターを取得（重複なし）"""
     global _used_character_indices
 
     # 名前が既に使われているキャラクターを除外
-    available = [
-        i for i in range(len(LLM_CHARACTERS))
-        if i not in _used_character_indices
-        and LLM_CHARACTERS[i]["name"] not in existing_names
-    ]
+    taken = get_character_indices(existing_names)
+    available = ALL_CHARACTER_INDICES - _used_character_indices - taken
 
     if not available:
         # 全て使用済みの場合はリセット
         _used_character_indices.clear()
-        available = [
-            i for i in range(len(LLM_CHARACTERS))
-            if LLM_CHARACTERS[i]["name"] not in existing_names
-        ]
+        available = ALL_CHARACTER_INDICES - taken
 
     if not available:
-        # それでもなければ最初のキャラクター
-        available = list(range(len(LLM_CHARACTERS)))
+        # それでもなければ全キャラクターから選ぶ
+        available = ALL_CHARACTER_INDICES
 
-    index = random.choice(available)
+    index = random.choice(sorted(available))
     _used_character_indices.add(index)
     return LLM_CHARACTERS[index]
 
 
+def get_next_llm_characters(existing_names: set[str], count: int) -> list[dict]:
+    """次のLLMキャラクターを count 人分まとめて取得（重複なし）"""
+    taken_names = set(existing_names)
+
+    available = sorted(
+        ALL_CHARACTER_INDICES - _used_character_indices - get_character_indices(taken_names)
+    )
+    selected = random.sample(available, min(count, len(available)))
+    _used_character_indices.update(selected)
+
+    characters = [LLM_CHARACTERS[i] for i in selected]
+    taken_names.update(c["name"] for c in characters)
+
+    # 足りない分は1人ずつ取得（使用済みのリセットなどのフォールバックを含む）
+    while len(characters) < count:
+        character = get_next_llm_character(taken_names)
+        taken_names.add(character["name"])
+        characters.append(character)
+
+    return characters
+
+
 def reset_character_selection() -> None:
     """キャラクター選択をリセット"""
     global _used_character_indices
@@ -155,10 +209,150 @@ TEAM_GOALS = {
     "吊り人陣営": "あなたは人狼のふりをしてください。人狼だと疑われるように振る舞い、矛盾した発言や怪しい態度を取りましょう。ただし、自分から「吊ってほしい」「処刑してほしい」とは絶対に言わないでください。",
 }
 
+# 夜の行動・投票で使うユーザープロンプト（str.formatで埋める）
+SEER_PROMPT_TEMPLATE = """あなたは占い師です。夜フェーズで行動を選んでください。
+
+選択肢:
+1. プレイヤーを1人選んで、その人の役職を見る
+2. 中央カード2枚を見る
+
+他のプレイヤー: {player_names}
+
+以下の形式で回答してください:
+- プレイヤーを見る場合: "占う: [プレイヤー名]"
+- 中央カードを見る場合: "占う: 中央"
+
+どちらか1つだけ選んでください。"""
+
+THIEF_PROMPT_TEMPLATE = """あなたは怪盗です。夜フェーズで誰かとカードを交換してください。
+交換後、相手の役職があなたの新しい役職になります。
+
+他のプレイヤー: {player_names}
+
+以下の形式で回答してください:
+交換: [プレイヤー名]
+
+プレイヤーを1人選んでください。"""
+
+HUNTER_PROMPT_TEMPLATE = """あなたは狩人です。夜フェーズで道連れ対象を選んでください。
+
+あなたが処刑された場合、指名したプレイヤーも道連れになります。
+
+他のプレイヤー: {player_names}
+
+以下の形式で回答してください:
+- 道連れを指名する場合: "道連れ: [プレイヤー名]"
+- 指名しない場合: "道連れ: なし"
+
+どちらか1つだけ選んでください。"""
+
+HUNTER_REVENGE_PROMPT_TEMPLATE = """あなたは処刑されました！狩人の能力で、最も人狼か大狼だと思うプレイヤーを道連れにできます。
+
+【他のプレイヤー】
+{player_list}
+{night_info}{discussion_text}{my_statements_text}
+
+あなたの陣営の勝利のために、最も人狼か大狼だと思うプレイヤーを道連れにしてください。
+議論の内容をよく思い出し、最も疑わしいプレイヤーを選んでください。
+必ず誰かを道連れにしてください。
+
+以下の形式で回答してください:
+道連れ: [プレイヤー名]
+
+理由は不要です。道連れ対象のみ回答してください。"""
+
+VOTE_PROMPT_TEMPLATE = """投票フェーズです。誰に投票しますか？
+
+【他のプレイヤー】
+{player_list}
+{night_info}{discussion_text}{my_statements_text}
+
+【選択肢】
+1. 上記のプレイヤーから1人を選んで投票する
+2. 「平和村」を選ぶ（誰も処刑しない）
+
+あなたの役職（{role}）と陣営の目標を考慮して、最善の選択をしてください。
+議論の内容をよく思い出し、最も疑わしいプレイヤーを投票してください。
+あなたが人狼なら、自分以外の誰かに疑いを向けてください。
+
+以下の形式で回答してください:
+- プレイヤーに投票: "投票: [プレイヤー名]"
+- 平和村: "投票: 平和村"
+
+理由は不要です。投票先のみ回答してください。"""
+
+# 同じLLMプレイヤーの複数の判断を1回の呼び出しでまとめて決めるユーザープロンプト（JSONモード）
+AGENT_PLAN_PROMPT_TEMPLATE = """投票フェーズです。このあとの判断をまとめて決めてください。
+
+【他のプレイヤー】
+{player_list}
+{night_info}{discussion_text}{my_statements_text}
+
+あなたの役職（{role}）と陣営の目標を考慮して、最善の選択をしてください。
+議論の内容をよく思い出し、最も疑わしいプレイヤーを選んでください。
+
+以下のキーを持つJSONオブジェクトだけを回答してください:
+{fields}
+
+理由は不要です。"""
+
+# AGENT_PLAN_PROMPT_TEMPLATE で指定できる判断: キー -> 回答形式の説明
+AGENT_PLAN_FIELDS = {
+    "vote": '- "vote": 投票するプレイヤー名（誰も処刑しない場合は "平和村"）',
+    "revenge_target": '- "revenge_target": あなたが処刑された場合に道連れにするプレイヤー名（最も人狼か大狼だと思う人。必ず誰かを選ぶ）',
+}
+HUNTER_PLAN_NEEDS = ("vote", "revenge_target")
+
+
+# 議論フェーズの発言生成で使うユーザープロンプト
+DISCUSSION_PROMPT_TEMPLATE = """昼の議論フェーズです。他のプレイヤーと話し合い、人狼を見つけ出しましょう。
+
+【他のプレイヤー】
+{player_names}
+{context_text}
+
+【これまでの議論】
+{discussion_history_text}{my_statements_text}
+
+あなたの役職（{role}）と陣営の目標を考慮して発言してください。
+- 嘘をついても構いません
+- 他のプレイヤーに質問しても良いです
+- 自分の役職をカミングアウトしても良いし、しなくても良いです
+- 過去の自分の発言と矛盾しないようにしてください
+- 議論の流れに沿った発言をしてください
+- あなたの性格と口調に合った発言をしてください
+
+短く自然な発言をしてください（1〜2文程度）。"""
+
+# 人狼の発言生成に加える、仲間との協調の指示
+WOLF_COOPERATION_TEMPLATE = """
+
+【重要：あなたは人狼です】
+仲間の人狼: {wolf_names}
+仲間の最近の発言:
+{wolf_statements_text}
+
+※ 仲間の発言と矛盾しないように注意してください。
+※ 仲間を庇いすぎると疑われるので自然に振る舞ってください。"""
+
+# 吊り人の発言生成に加える、戦略上の注意
+TANNER_STRATEGY_TEXT = """
+
+【重要：あなたは吊り人です - 戦略的アドバイス】
+- 人狼のふりをして疑いを集めてください
+- 矛盾した発言や、他人を不自然に庇うなど怪しい行動を取りましょう
+- 「吊ってほしい」「処刑してほしい」「自分を投票して」などの発言は絶対にしないでください
+- 不自然な自白や、わざとらしい怪しさは逆効果です。さりげなく怪しく振る舞いましょう
+- 他のプレイヤーに「人狼では？」と疑われるのが理想です"""
+
+# 応答から選択を読み取るキーワード（応答ごとに1回の検索で判定する）
+SEER_CENTER_PATTERN = re.compile(r"中央|center", re.IGNORECASE)
+HUNTER_SKIP_PATTERN = re.compile(r"なし|skip", re.IGNORECASE)
+PEACE_VILLAGE_KEYWORD = "平和"  # 「平和村」も含む
+
 
 def get_role_team_name(role: Role) -> str:
     """役職から陣営名を取得する。"""
-    from game.models import get_team, Team
     team = get_team(role)
     if team == Team.VILLAGE:
         return "村人陣営"
@@ -176,8 +370,14 @@ def get_role_description(role: Role) -> str:
 
 
 def build_role_composition_text(game: GameState) -> str:
-    """ゲームの役職構成をテキスト形式で返す。"""
-    from collections import Counter
+    """ゲームの役職構成をテキスト形式で返す（ゲーム中は作成済みのものを使い回す）。"""
+    if game.role_composition_text is None:
+        game.role_composition_text = _format_role_composition(game)
+    return game.role_composition_text
+
+
+def _format_role_composition(game: GameState) -> str:
+    """役職構成テキストを作成する。"""
     from config import ROLE_CONFIG
 
     if game.custom_role_config is not None:
@@ -197,33 +397,188 @@ def build_role_composition_text(game: GameState) -> str:
     )
 
 
-def build_system_prompt(role: Role, game: Optional[GameState] = None) -> str:
-    """役職に応じたシステムプロンプトを構築する。"""
+@lru_cache(maxsize=None)
+def build_role_system_prompt(role: Role) -> str:
+    """役職ごとのシステムプロンプト（ゲームに依存しない部分）を構築する。"""
     team_name = get_role_team_name(role)
-
-    # 役職構成テキスト
-    role_composition = ""
-    if game is not None:
-        role_composition = "\n\n" + build_role_composition_text(game)
-
     return SYSTEM_PROMPT.format(
         rules=RULES_CONTENT,
         role=role.value,
         team=team_name,
         role_description=get_role_description(role),
         goal=TEAM_GOALS.get(team_name, "ゲームを楽しみましょう。"),
-    ) + role_composition
+    )
+
+
+def build_system_prompt(role: Role, game: Optional[GameState] = None) -> str:
+    """
+    役職に応じたシステムプロンプトを構築する。
+    
+    ゲームごとに役職単位でキャッシュするので、同じゲーム・役職では毎回同じ文字列になる
+    （先頭が一致するためAPI側のプロンプトキャッシュも効きやすい）。
+    """
+    if game is None:
+        return build_role_system_prompt(role)
+    prompt = game.system_prompts.get(role)
+    if prompt is None:
+        prompt = build_role_system_prompt(role) + "\n\n" + build_role_composition_text(game)
+        game.system_prompts[role] = prompt
+    return prompt
 
 
 # =============================================================================
 # LLM API呼び出し
 # =============================================================================
 
+class AsyncTokenBucket:
+    """
+    asyncio用のトークンバケット。
+
+    capacity 回までは連続で通し、それ以降は refill_rate 回/秒のペースに制限する。
+    """
+
+    def __init__(self, capacity: int, refill_rate: float):
+        self.capacity = max(1, capacity)
+        self.refill_rate = refill_rate
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """トークンを1つ取得する（空なら補充されるまで待つ）。"""
+        # ロックを持ったまま待つことで、待機中の呼び出しを到着順に通す
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.refill_rate)
+                self._refill()
+            self._tokens -= 1
+
+
+_rate_limiter = AsyncTokenBucket(API_RATE_LIMIT_BURST, API_RATE_LIMIT_PER_SEC)
+
+
+def get_retry_after(response: httpx.Response) -> Optional[float]:
+    """429レスポンスのヘッダーから待機秒数を取り出す（不明ならNone）。"""
+    for header in ("Retry-After", "X-RateLimit-Reset-After"):
+        value = response.headers.get(header)
+        if value is None:
+            continue
+        try:
+            return min(max(float(value), 0.0), API_RETRY_AFTER_MAX)
+        except ValueError:
+            continue  # HTTP日付形式などは扱わない
+    return None
+
+
+def get_retry_backoff(attempt: int) -> float:
+    """attempt回目の失敗後に待つ秒数（指数バックオフ＋ジッター）。"""
+    return min(API_RETRY_BACKOFF_MAX, API_RETRY_BACKOFF_INITIAL * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def record_api_success() -> None:
+    """API呼び出しの成功を記録する（連続失敗回数をリセット）。"""
+    global _consecutive_failures
+    _consecutive_failures = 0
+
+
+def record_api_failure() -> None:
+    """リトライしても失敗したAPI呼び出しを記録し、続いていれば回路を開く。"""
+    global _consecutive_failures, _circuit_open_until
+    _consecutive_failures += 1
+    if _consecutive_failures >= CIRCUIT_BREAKER_THRESHOLD:
+        _circuit_open_until = time.monotonic() + CIRCUIT_BREAKER_COOL_OFF
+        _consecutive_failures = 0
+        print(f"Grok API が{CIRCUIT_BREAKER_THRESHOLD}回続けて失敗したため、{CIRCUIT_BREAKER_COOL_OFF:.0f}秒間呼び出しを止めます")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """共有のHTTPクライアントを返す（初回呼び出し時に作成）。"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """共有のHTTPクライアントを閉じる（Bot終了時に呼ぶ）。"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def encode_json(value) -> bytes:
+    """リクエストボディ用にJSONをUTF-8でエンコードする（日本語はエスケープしない）。"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=64)
+def encode_system_message(content: str) -> bytes:
+    """
+    システムメッセージをエンコードする。
+    
+    システムプロンプトはゲーム・役職ごとに同じ文字列を使い回すため、
+    長いルール文のエンコードは最初の1回だけで済む。
+    """
+    return encode_json({"role": "system", "content": content})
+
+
+def encode_payload(payload: dict, messages: list[dict[str, str]]) -> bytes:
+    """payload（messages以外）とmessagesからリクエストボディを組み立てる。"""
+    encoded_messages = b",".join(
+        encode_system_message(m["content"]) if m["role"] == "system" else encode_json(m)
+        for m in messages
+    )
+    # payload は空でないので、閉じ括弧の前に messages を差し込む
+    return encode_json(payload)[:-1] + b',"messages":[' + encoded_messages + b"]}"
+
+
+async def read_streamed_content(
+    response: httpx.Response,
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    SSEのチャンク（data: 行）から本文の差分を順に取り出して連結する。
+    
+    on_delta を渡すと、差分が届くたびにそこまでの本文全体で呼び出す。
+    """
+    parts = []
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        choices = json.loads(data).get("choices")
+        if choices:
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                parts.append(content)
+                if on_delta is not None:
+                    on_delta("".join(parts))
+    return "".join(parts)
+
+
 async def call_grok_api(
     messages: list[dict[str, str]],
     temperature: float = 0.8,
     max_tokens: int = 256,
-    max_retries: int = 3,
+    max_retries: int = API_MAX_ATTEMPTS,
+    stream: bool = False,
+    on_delta: Optional[Callable[[str], None]] = None,
+    json_mode: bool = False,
 ) -> Optional[str]:
     """
     Grok APIを呼び出してレスポンスを取得する。
@@ -232,23 +587,22 @@ async def call_grok_api(
         messages: チャットメッセージのリスト
         temperature: 生成の温度パラメータ
         max_tokens: 最大トークン数
-        max_retries: 接続エラー時の最大リトライ回数
+        max_retries: 接続エラー・429・5xx時の最大リトライ回数
+        stream: SSEで受信する（生成完了を待たずに届いた分から読み進める）
+        on_delta: stream時、受信途中の本文を受け取るコールバック（リトライ時は空から送り直される）
+        json_mode: JSONオブジェクトだけを返すよう指定する（response_format: json_object）
 
     Returns:
-        生成されたテキスト。エラー時はNone。
+        生成されたテキスト。エラー時やサーキットブレーカーが開いている間はNone。
     """
-    global _last_api_call_time
-
     api_key = get_xai_api_key()
     if not api_key:
         print("Warning: XAI_API_KEY is not set")
         return None
 
-    # レート制限: 前回呼び出しから一定時間経過を待つ
-    elapsed = time.time() - _last_api_call_time
-    if elapsed < API_CALL_INTERVAL:
-        await asyncio.sleep(API_CALL_INTERVAL - elapsed)
-    _last_api_call_time = time.time()
+    # 連続失敗で回路が開いている間は呼び出さない（呼び出し側はランダム行動に切り替わる）
+    if time.monotonic() < _circuit_open_until:
+        return None
 
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -257,37 +611,64 @@ async def call_grok_api(
 
     payload = {
         "model": XAI_MODEL,
-        "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    if stream:
+        payload["stream"] = True
+    body = encode_payload(payload, messages)
 
     for attempt in range(max_retries):
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(XAI_API_URL, headers=headers, json=payload)
+            # レート制限: トークンバケットから1回分の枠を取得する
+            await _rate_limiter.acquire()
+            client = get_http_client()
+            if stream:
+                async with client.stream(
+                    "POST", XAI_API_URL, headers=headers, content=body
+                ) as response:
+                    response.raise_for_status()
+                    content = await read_streamed_content(response, on_delta)
+            else:
+                response = await client.post(XAI_API_URL, headers=headers, content=body)
                 response.raise_for_status()
                 data = response.json()
-                return data["choices"][0]["message"]["content"]
+                content = data["choices"][0]["message"]["content"]
+            record_api_success()
+            return content
         except httpx.HTTPStatusError as e:
-            if e.response.status_code == 403:
+            status = e.response.status_code
+            if status == 429 or status >= 500:
+                if attempt < max_retries - 1:
+                    wait_time = get_retry_after(e.response) if status == 429 else None
+                    if wait_time is None:
+                        wait_time = get_retry_backoff(attempt)
+                    print(f"Grok API HTTP {status} (attempt {attempt + 1}/{max_retries}): {wait_time:.1f}秒後にリトライします")
+                    await asyncio.sleep(wait_time)
+                    continue
+                print(f"Grok API HTTP {status} after {max_retries} retries")
+                record_api_failure()
+            elif status == 403:
                 print(f"Grok API 403 Forbidden: APIキーが無効か、モデル '{XAI_MODEL}' にアクセス権がありません")
                 print("環境変数 XAI_MODEL でモデルを変更できます")
-            elif e.response.status_code == 401:
+            elif status == 401:
                 print("Grok API 401 Unauthorized: APIキーが設定されていないか無効です")
             else:
                 print(f"Grok API HTTP error: {e}")
-            return None  # HTTPエラーはリトライしない
+            return None  # 429・5xx以外のHTTPエラーはリトライしない
         except (httpx.RequestError, ssl.SSLError) as e:
             if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 1  # 1秒, 2秒, 3秒
+                wait_time = get_retry_backoff(attempt)
                 print(f"Grok API connection error (attempt {attempt + 1}/{max_retries}): {e}")
-                print(f"Retrying in {wait_time} seconds...")
+                print(f"Retrying in {wait_time:.1f} seconds...")
                 await asyncio.sleep(wait_time)
                 continue
             print(f"Grok API connection error after {max_retries} retries: {e}")
+            record_api_failure()
             return None
-        except (KeyError, IndexError) as e:
+        except (KeyError, IndexError, ValueError) as e:
             print(f"Grok API response parse error: {e}")
             return None
 
@@ -298,10 +679,61 @@ async def call_grok_api(
 # ゲームアクション
 # =============================================================================
 
+def build_decision_context(
+    game: GameState,
+    player: Player,
+    discussion_context: str = "",
+) -> tuple[str, str, str]:
+    """
+    投票・道連れの判断用に (夜の情報, 議論の内容, 自分の過去の発言) のテキストを作る。
+    
+    discussion_context を渡した場合は、GameStateの議論履歴の代わりに使う。
+    """
+    # 夜の行動結果があれば追加情報として含める
+    night_info = ""
+    if player.night_action and player.night_action.result:
+        night_info = f"\n\n【あなたが夜に得た情報】\n{player.night_action.result}"
+
+    # 議論履歴を取得（引数で渡されたか、GameStateから取得）
+    discussion_text = ""
+    if discussion_context:
+        discussion_text = f"\n\n【議論の内容】\n{discussion_context}"
+    elif game.discussion_history:
+        discussion_text = f"\n\n【議論の内容】\n{game.get_discussion_history_text(limit=DECISION_CONTEXT_LIMIT)}"
+
+    # 自分の発言履歴
+    my_statements_text = ""
+    if player.my_statements:
+        recent_statements = player.recent_statements(5)  # 最新5件
+        my_statements_text = f"\n\n【あなたの過去の発言】\n" + "\n".join(f"- {s}" for s in recent_statements)
+
+    return night_info, discussion_text, my_statements_text
+
+
+def random_seer_action(
+    game: GameState,
+    other_players: Sequence[Player],
+) -> tuple[str, Optional[int]]:
+    """占い師の行動をランダムに決める: 中央カード（1/2）といずれかのプレイヤー（残り1/2を等分）から1回で選ぶ。"""
+    options = [("center", None)] + [("player", p.user_id) for p in other_players]
+    weights = [max(1, len(other_players))] + [1] * len(other_players)
+    return game.rng.choices(options, weights=weights)[0]
+
+
+def random_thief_action(game: GameState, other_players: Sequence[Player]) -> Optional[int]:
+    """怪盗の交換相手をランダムに決める（必ず交換）。"""
+    return game.rng.choice(other_players).user_id
+
+
+def random_hunter_action(game: GameState, other_players: Sequence[Player]) -> Optional[int]:
+    """狩人の道連れ対象をランダムに1人指名する。"""
+    return game.rng.choice(other_players).user_id
+
+
 async def llm_seer_action(
     game: GameState,
     player: Player,
-    other_players: list[Player],
+    other_players: Sequence[Player],
 ) -> tuple[str, Optional[int]]:
     """
     占い師のLLMプレイヤーが行動を決定する。
@@ -309,22 +741,14 @@ async def llm_seer_action(
     Returns:
         (action_type, target_id): "center" or "player"とターゲットID
     """
+    if game.player_count < LLM_NIGHT_FLOOR_PLAYERS:
+        return random_seer_action(game, other_players)
+
     system_prompt = build_system_prompt(player.initial_role, game)
     
-    player_names = ", ".join(p.username for p in other_players)
-    user_prompt = f"""あなたは占い師です。夜フェーズで行動を選んでください。
-
-選択肢:
-1. プレイヤーを1人選んで、その人の役職を見る
-2. 中央カード2枚を見る
-
-他のプレイヤー: {player_names}
-
-以下の形式で回答してください:
-- プレイヤーを見る場合: "占う: [プレイヤー名]"
-- 中央カードを見る場合: "占う: 中央"
-
-どちらか1つだけ選んでください。"""
+    user_prompt = SEER_PROMPT_TEMPLATE.format(
+        player_names=game.get_other_player_names(player.user_id)
+    )
 
     messages = [
         {"role": "system", "content": system_prompt},
@@ -334,27 +758,21 @@ async def llm_seer_action(
     response = await call_grok_api(messages)
     
     if response:
-        response_lower = response.lower()
-        if "中央" in response or "center" in response_lower:
+        if SEER_CENTER_PATTERN.search(response):
             return ("center", None)
         
         # プレイヤー名を探す
-        for p in other_players:
-            if p.username in response:
-                return ("player", p.user_id)
+        target = game.find_other_player_in(player.user_id, response)
+        if target is not None:
+            return ("player", target.user_id)
     
-    # デフォルト: ランダムに選択
-    if random.random() < 0.5:
-        return ("center", None)
-    else:
-        target = random.choice(other_players)
-        return ("player", target.user_id)
+    return random_seer_action(game, other_players)
 
 
 async def llm_thief_action(
     game: GameState,
     player: Player,
-    other_players: list[Player],
+    other_players: Sequence[Player],
 ) -> Optional[int]:
     """
     怪盗のLLMプレイヤーが行動を決定する。
@@ -362,18 +780,14 @@ async def llm_thief_action(
     Returns:
         target_id: 交換するプレイヤーのID、スキップならNone
     """
+    if game.player_count < LLM_NIGHT_FLOOR_PLAYERS:
+        return random_thief_action(game, other_players)
+
     system_prompt = build_system_prompt(player.initial_role, game)
     
-    player_names = ", ".join(p.username for p in other_players)
-    user_prompt = f"""あなたは怪盗です。夜フェーズで誰かとカードを交換してください。
-交換後、相手の役職があなたの新しい役職になります。
-
-他のプレイヤー: {player_names}
-
-以下の形式で回答してください:
-交換: [プレイヤー名]
-
-プレイヤーを1人選んでください。"""
+    user_prompt = THIEF_PROMPT_TEMPLATE.format(
+        player_names=game.get_other_player_names(player.user_id)
+    )
 
     messages = [
         {"role": "system", "content": system_prompt},
@@ -384,18 +798,17 @@ async def llm_thief_action(
 
     if response:
         # プレイヤー名を探す
-        for p in other_players:
-            if p.username in response:
-                return p.user_id
+        target = game.find_other_player_in(player.user_id, response)
+        if target is not None:
+            return target.user_id
 
-    # デフォルト: 必ず交換
-    return random.choice(other_players).user_id
+    return random_thief_action(game, other_players)
 
 
 async def llm_hunter_action(
     game: GameState,
     player: Player,
-    other_players: list[Player],
+    other_players: Sequence[Player],
 ) -> Optional[int]:
     """
     狩人のLLMプレイヤーが道連れ対象を決定する。
@@ -403,20 +816,14 @@ async def llm_hunter_action(
     Returns:
         target_id: 道連れ対象のID、指名しない場合はNone
     """
+    if game.player_count < LLM_NIGHT_FLOOR_PLAYERS:
+        return random_hunter_action(game, other_players)
+
     system_prompt = build_system_prompt(player.initial_role, game)
     
-    player_names = ", ".join(p.username for p in other_players)
-    user_prompt = f"""あなたは狩人です。夜フェーズで道連れ対象を選んでください。
-
-あなたが処刑された場合、指名したプレイヤーも道連れになります。
-
-他のプレイヤー: {player_names}
-
-以下の形式で回答してください:
-- 道連れを指名する場合: "道連れ: [プレイヤー名]"
-- 指名しない場合: "道連れ: なし"
-
-どちらか1つだけ選んでください。"""
+    user_prompt = HUNTER_PROMPT_TEMPLATE.format(
+        player_names=game.get_other_player_names(player.user_id)
+    )
 
     messages = [
         {"role": "system", "content": system_prompt},
@@ -426,22 +833,21 @@ async def llm_hunter_action(
     response = await call_grok_api(messages)
     
     if response:
-        if "なし" in response or "skip" in response.lower():
+        if HUNTER_SKIP_PATTERN.search(response):
             return None
         
         # プレイヤー名を探す
-        for p in other_players:
-            if p.username in response:
-                return p.user_id
+        target = game.find_other_player_in(player.user_id, response)
+        if target is not None:
+            return target.user_id
     
-    # デフォルト: ランダムに1人指名
-    return random.choice(other_players).user_id
+    return random_hunter_action(game, other_players)
 
 
 async def llm_hunter_revenge_action(
     game: GameState,
     player: Player,
-    other_players: list[Player],
+    other_players: Sequence[Player],
 ) -> int:
     """
     処刑されたLLM狩人が道連れ対象を決定する。
@@ -452,63 +858,54 @@ async def llm_hunter_revenge_action(
     """
     system_prompt = build_system_prompt(player.current_role, game)
 
-    player_info = []
-    for p in other_players:
-        player_info.append(f"- {p.username}")
-    player_list = "\n".join(player_info)
-
-    # 夜の行動結果があれば追加情報として含める
-    night_info = ""
-    if player.night_action and player.night_action.result:
-        night_info = f"\n\n【あなたが夜に得た情報】\n{player.night_action.result}"
-
-    # 議論履歴を取得
-    discussion_text = ""
-    if game.discussion_history:
-        discussion_text = f"\n\n【議論の内容】\n{game.get_discussion_history_text(limit=9999)}"
-
-    # 自分の発言履歴
-    my_statements_text = ""
-    if player.my_statements:
-        recent_statements = player.my_statements[-5:]  # 最新5件
-        my_statements_text = f"\n\n【あなたの過去の発言】\n" + "\n".join(f"- {s}" for s in recent_statements)
-
-    user_prompt = f"""あなたは処刑されました！狩人の能力で、最も人狼か大狼だと思うプレイヤーを道連れにできます。
-
-【他のプレイヤー】
-{player_list}
-{night_info}{discussion_text}{my_statements_text}
+    player_list = "\n".join(f"- {p.username}" for p in other_players)
+    night_info, discussion_text, my_statements_text = build_decision_context(game, player)
 
-あなたの陣営の勝利のために、最も人狼か大狼だと思うプレイヤーを道連れにしてください。
-議論の内容をよく思い出し、最も疑わしいプレイヤーを選んでください。
-必ず誰かを道連れにしてください。
-
-以下の形式で回答してください:
-道連れ: [プレイヤー名]
-
-理由は不要です。道連れ対象のみ回答してください。"""
+    user_prompt = HUNTER_REVENGE_PROMPT_TEMPLATE.format(
+        player_list=player_list,
+        night_info=night_info,
+        discussion_text=discussion_text,
+        my_statements_text=my_statements_text,
+    )
 
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt},
     ]
 
-    response = await call_grok_api(messages)
+    try:
+        response = await asyncio.wait_for(call_grok_api(messages), timeout=HUNTER_REVENGE_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"LLM狩人 {player.username} の道連れ判断が{HUNTER_REVENGE_TIMEOUT:.0f}秒で終わらなかったため、議論履歴から選びます")
+        response = None
 
     if response:
         # プレイヤー名を探す
-        for p in other_players:
-            if p.username in response:
-                return p.user_id
+        target = game.find_other_player_in(player.user_id, response)
+        if target is not None:
+            return target.user_id
+
+    # デフォルト: 議論で最も名前が挙がったプレイヤー（同数ならランダム）を指名（スキップしない）
+    return most_mentioned_player_id(game, other_players)
+
 
-    # デフォルト: ランダムに1人指名（スキップしない）
-    return random.choice(other_players).user_id
+def most_mentioned_player_id(game: GameState, other_players: Sequence[Player]) -> int:
+    """議論履歴で最も多く名前が出たプレイヤーのIDを返す（最多が複数いればその中からランダム）。"""
+    pattern, by_name = build_name_matcher(other_players)
+    counts: Counter[int] = Counter()
+    if pattern is not None:
+        for _speaker, message in game.discussion_history:
+            counts.update(by_name[m.group(0)].user_id for m in pattern.finditer(message))
+    if not counts:
+        return game.rng.choice(other_players).user_id
+    top = max(counts.values())
+    return game.rng.choice([user_id for user_id, count in counts.items() if count == top])
 
 
 async def llm_vote(
     game: GameState,
     player: Player,
-    other_players: list[Player],
+    other_players: Sequence[Player],
     discussion_context: str = "",
 ) -> int:
     """
@@ -532,48 +929,18 @@ async def llm_vote(
 
     system_prompt = build_system_prompt(perceived_role, game)
     
-    player_info = []
-    for p in other_players:
-        player_info.append(f"- {p.username}")
-    player_list = "\n".join(player_info)
-    
-    # 夜の行動結果があれば追加情報として含める
-    night_info = ""
-    if player.night_action and player.night_action.result:
-        night_info = f"\n\n【あなたが夜に得た情報】\n{player.night_action.result}"
-    
-    # 議論履歴を取得（引数で渡されたか、GameStateから取得）
-    discussion_text = ""
-    if discussion_context:
-        discussion_text = f"\n\n【議論の内容】\n{discussion_context}"
-    elif game.discussion_history:
-        discussion_text = f"\n\n【議論の内容】\n{game.get_discussion_history_text(limit=9999)}"
-    
-    # 自分の発言履歴
-    my_statements_text = ""
-    if player.my_statements:
-        recent_statements = player.my_statements[-5:]  # 最新5件
-        my_statements_text = f"\n\n【あなたの過去の発言】\n" + "\n".join(f"- {s}" for s in recent_statements)
+    player_list = "\n".join(f"- {p.username}" for p in other_players)
+    night_info, discussion_text, my_statements_text = build_decision_context(
+        game, player, discussion_context
+    )
     
-    user_prompt = f"""投票フェーズです。誰に投票しますか？
-
-【他のプレイヤー】
-{player_list}
-{night_info}{discussion_text}{my_statements_text}
-
-【選択肢】
-1. 上記のプレイヤーから1人を選んで投票する
-2. 「平和村」を選ぶ（誰も処刑しない）
-
-あなたの役職（{perceived_role.value}）と陣営の目標を考慮して、最善の選択をしてください。
-議論の内容をよく思い出し、最も疑わしいプレイヤーを投票してください。
-あなたが人狼なら、自分以外の誰かに疑いを向けてください。
-
-以下の形式で回答してください:
-- プレイヤーに投票: "投票: [プレイヤー名]"
-- 平和村: "投票: 平和村"
-
-理由は不要です。投票先のみ回答してください。"""
+    user_prompt = VOTE_PROMPT_TEMPLATE.format(
+        player_list=player_list,
+        night_info=night_info,
+        discussion_text=discussion_text,
+        my_statements_text=my_statements_text,
+        role=perceived_role.value,
+    )
 
     messages = [
         {"role": "system", "content": system_prompt},
@@ -583,24 +950,94 @@ async def llm_vote(
     response = await call_grok_api(messages)
     
     if response:
-        if "平和村" in response or "平和" in response:
+        if PEACE_VILLAGE_KEYWORD in response:
             return -1
         
         # プレイヤー名を探す
-        for p in other_players:
-            if p.username in response:
-                return p.user_id
+        target = game.find_other_player_in(player.user_id, response)
+        if target is not None:
+            return target.user_id
     
     # デフォルト: ランダムに投票（平和村を含む）
     choices = [p.user_id for p in other_players] + [-1]
-    return random.choice(choices)
+    return game.rng.choice(choices)
+
+
+async def llm_combined_agent_plan(
+    game: GameState,
+    player: Player,
+    other_players: Sequence[Player],
+    needs: Sequence[str] = HUNTER_PLAN_NEEDS,
+) -> dict[str, int]:
+    """
+    同じLLMプレイヤーの複数の判断（投票先と道連れ対象など）を1回のAPI呼び出しで決定する。
+    
+    システムプロンプトと議論履歴の処理が1回で済む。別のプレイヤー同士の判断は
+    情報が混ざらないよう、これまで通り別々の呼び出しを並列に行うこと。
+    
+    Args:
+        needs: 決める判断のキー（AGENT_PLAN_FIELDS のキー）
+    
+    Returns:
+        判断のキー -> 対象のuser_id（"vote" の -1 は平和村）。
+        応答から読み取れなかった判断は、それぞれの関数と同じくランダムに決める。
+    """
+    perceived_role = get_perceived_role(player)
+    system_prompt = build_system_prompt(perceived_role, game)
+
+    player_list = "\n".join(f"- {p.username}" for p in other_players)
+    night_info, discussion_text, my_statements_text = build_decision_context(game, player)
+
+    user_prompt = AGENT_PLAN_PROMPT_TEMPLATE.format(
+        player_list=player_list,
+        night_info=night_info,
+        discussion_text=discussion_text,
+        my_statements_text=my_statements_text,
+        role=perceived_role.value,
+        fields="\n".join(AGENT_PLAN_FIELDS[need] for need in needs),
+    )
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    response = await call_grok_api(messages, json_mode=True)
+
+    answers = {}
+    if response:
+        try:
+            answers = json.loads(response)
+        except ValueError:
+            print(f"LLM plan JSON parse error: {response!r}")
+        if not isinstance(answers, dict):
+            answers = {}
+
+    plan: dict[str, int] = {}
+    for need in needs:
+        answer = answers.get(need)
+        if isinstance(answer, str):
+            if need == "vote" and PEACE_VILLAGE_KEYWORD in answer:
+                plan[need] = -1
+                continue
+            target = game.find_other_player_in(player.user_id, answer)
+            if target is not None:
+                plan[need] = target.user_id
+                continue
+        # デフォルト: 投票は平和村を含めてランダム、それ以外はランダムに1人
+        if need == "vote":
+            plan[need] = game.rng.choice([p.user_id for p in other_players] + [-1])
+        else:
+            plan[need] = game.rng.choice(other_players).user_id
+    return plan
 
 
 async def llm_generate_discussion_message(
     game: GameState,
     player: Player,
-    other_players: list[Player],
+    other_players: Sequence[Player],
     _context: str = "",
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> Optional[str]:
     """
     LLMプレイヤーが議論フェーズでの発言を生成する。
@@ -610,6 +1047,7 @@ async def llm_generate_discussion_message(
         player: 発言するプレイヤー
         other_players: 他のプレイヤーリスト
         _context: 最新の発言（トリガー）- 現在未使用、将来の拡張用
+        on_delta: 生成途中の発言を受け取るコールバック（逐次表示用）
 
     Returns:
         発言内容
@@ -619,90 +1057,67 @@ async def llm_generate_discussion_message(
 
     system_prompt = build_system_prompt(perceived_role, game)
 
-    player_names = ", ".join(p.username for p in other_players)
-    
+    # 役職・性格に応じた追加情報は、まとめて1回で連結する
+    context_parts: list[str] = []
+
     # 夜の行動結果
-    night_info = ""
     if player.night_action and player.night_action.result:
-        night_info = f"\n\n【夜に得た情報（他のプレイヤーには見えていない）】\n{player.night_action.result}"
-    
-    # 議論履歴全体を取得
-    discussion_history_text = game.get_discussion_history_text(limit=15)
-    
-    # 自分の過去の発言
-    my_statements_text = ""
-    if player.my_statements:
-        recent_statements = player.my_statements[-3:]  # 最新3件
-        my_statements_text = f"\n\n【あなたの過去の発言】\n" + "\n".join(f"- {s}" for s in recent_statements)
+        context_parts += ("\n\n【夜に得た情報（他のプレイヤーには見えていない）】\n", player.night_action.result)
 
     # 性格・口調設定
-    personality_text = ""
     if player.personality:
-        personality_text = f"\n\n【あなたの性格】\n{player.personality}"
+        context_parts += ("\n\n【あなたの性格】\n", player.personality)
     if player.speech_style:
-        personality_text += f"\n\n【あなたの口調】\n{player.speech_style}"
+        context_parts += ("\n\n【あなたの口調】\n", player.speech_style)
 
     # 人狼協調：発言者が人狼の場合、仲間の発言を追跡
-    wolf_cooperation_text = ""
-    if player.initial_role in (Role.WEREWOLF, Role.ALPHA_WOLF):
+    if player.initial_role in WOLF_ROLES:
         # 仲間の人狼を探す
         fellow_wolves = [
             p for p in other_players
-            if p.initial_role in (Role.WEREWOLF, Role.ALPHA_WOLF)
+            if p.initial_role in WOLF_ROLES
         ]
         if fellow_wolves:
             wolf_names = ", ".join(w.username for w in fellow_wolves)
-            # 仲間の発言を議論履歴から抽出
-            wolf_statements = []
-            for speaker_name, msg in game.discussion_history[-15:]:
-                if any(w.username == speaker_name for w in fellow_wolves):
-                    wolf_statements.append(f"- {speaker_name}: {msg}")
+            # 仲間の最近の発言（人狼の発言はGameStateが別に保持している）
+            wolf_statements = [
+                f"- {speaker_name}: {msg}"
+                for speaker_name, msg in game.wolf_statements
+                if speaker_name != player.username
+            ]
             wolf_statements_text = "\n".join(wolf_statements[-5:]) if wolf_statements else "（まだ発言なし）"
-            wolf_cooperation_text = f"""
-
-【重要：あなたは人狼です】
-仲間の人狼: {wolf_names}
-仲間の最近の発言:
-{wolf_statements_text}
-
-※ 仲間の発言と矛盾しないように注意してください。
-※ 仲間を庇いすぎると疑われるので自然に振る舞ってください。"""
+            context_parts.append(WOLF_COOPERATION_TEMPLATE.format(
+                wolf_names=wolf_names,
+                wolf_statements_text=wolf_statements_text,
+            ))
 
     # 吊り人の場合：戦略的注意事項
-    tanner_warning_text = ""
     if perceived_role == Role.TANNER:
-        tanner_warning_text = """
-
-【重要：あなたは吊り人です - 戦略的アドバイス】
-- 人狼のふりをして疑いを集めてください
-- 矛盾した発言や、他人を不自然に庇うなど怪しい行動を取りましょう
-- 「吊ってほしい」「処刑してほしい」「自分を投票して」などの発言は絶対にしないでください
-- 不自然な自白や、わざとらしい怪しさは逆効果です。さりげなく怪しく振る舞いましょう
-- 他のプレイヤーに「人狼では？」と疑われるのが理想です"""
-
-    user_prompt = f"""昼の議論フェーズです。他のプレイヤーと話し合い、人狼を見つけ出しましょう。
-
-【他のプレイヤー】
-{player_names}
-{night_info}{personality_text}{wolf_cooperation_text}{tanner_warning_text}
+        context_parts.append(TANNER_STRATEGY_TEXT)
 
-【これまでの議論】
-{discussion_history_text}{my_statements_text}
-
-あなたの役職（{perceived_role.value}）と陣営の目標を考慮して発言してください。
-- 嘘をついても構いません
-- 他のプレイヤーに質問しても良いです
-- 自分の役職をカミングアウトしても良いし、しなくても良いです
-- 過去の自分の発言と矛盾しないようにしてください
-- 議論の流れに沿った発言をしてください
-- あなたの性格と口調に合った発言をしてください
-
-短く自然な発言をしてください（1〜2文程度）。"""
+    # 最近の議論履歴を取得
+    discussion_history_text = game.get_discussion_history_text(limit=DISCUSSION_CONTEXT_LIMIT)
+    
+    # 自分の過去の発言
+    my_statements_text = ""
+    if player.my_statements:
+        recent_statements = player.recent_statements(3)  # 最新3件
+        my_statements_text = "\n\n【あなたの過去の発言】\n- " + "\n- ".join(recent_statements)
+
+    user_prompt = DISCUSSION_PROMPT_TEMPLATE.format(
+        player_names=game.get_other_player_names(player.user_id),
+        context_text="".join(context_parts),
+        discussion_history_text=discussion_history_text,
+        my_statements_text=my_statements_text,
+        role=perceived_role.value,
+    )
 
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt},
     ]
     
-    return await call_grok_api(messages, temperature=0.9, max_tokens=128)
+    return await call_grok_api(
+        messages, temperature=0.9, max_tokens=128, stream=True, on_delta=on_delta
+    )
 
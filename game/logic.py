@@ -5,7 +5,6 @@
 Discord依存のコードは含めず、純粋なゲームロジックのみを記述する。
 """
 
-import random
 from typing import Optional
 from game.models import (
     Role,
@@ -15,6 +14,8 @@ from game.models import (
     Player,
     NightAction,
     NightActionType,
+    ROLE_LABELS,
+    WOLF_ROLES,
     get_team,
 )
 
@@ -52,7 +53,7 @@ def setup_game(state: GameState, role_list: list[Role]) -> None:
     
     # 役職をシャッフル
     shuffled_roles = role_list.copy()
-    random.shuffle(shuffled_roles)
+    state.rng.shuffle(shuffled_roles)
     
     # プレイヤーに役職を配布
     player_ids = list(state.players.keys())
@@ -60,14 +61,20 @@ def setup_game(state: GameState, role_list: list[Role]) -> None:
         role = shuffled_roles[i]
         state.players[user_id].initial_role = role
         state.players[user_id].current_role = role
+    state.index_initial_roles()  # 夜フェーズの役職検索用（初期役職はゲーム中に変わらない）
+    state.on_current_roles_changed()
     
-    # 残りを中央カードに
-    state.center_cards = shuffled_roles[player_count:]
+    # 残りを中央カードに（再戦時はリセット済みのリストをそのまま使い回す）
+    state.center_cards[:] = shuffled_roles[player_count:]
     
     # 夜の行動順序を設定
-    state.night_action_order = NIGHT_ACTION_ORDER.copy()
+    state.night_action_order[:] = NIGHT_ACTION_ORDER
     state.night_action_index = 0
     
+    # 役職構成が変わっている可能性があるため、LLM用の構成テキストとプロンプトを作り直させる
+    state.role_composition_text = None
+    state.system_prompts.clear()
+    
     # フェーズを夜に
     state.phase = GamePhase.NIGHT
 
@@ -105,10 +112,8 @@ def is_night_phase_complete(state: GameState) -> bool:
 # =============================================================================
 
 def get_all_wolves(state: GameState) -> list[Player]:
-    """人狼陣営の狼（人狼・大狼）をすべて取得する。"""
-    werewolves = state.get_players_by_initial_role(Role.WEREWOLF)
-    alpha_wolves = state.get_players_by_initial_role(Role.ALPHA_WOLF)
-    return werewolves + alpha_wolves
+    """人狼陣営の狼（人狼・大狼）をすべて取得する（プレイヤーを1回だけ走査）。"""
+    return [p for p in state.players.values() if p.initial_role in WOLF_ROLES]
 
 
 def process_werewolf_night(state: GameState) -> dict[int, list[Player]]:
@@ -126,6 +131,9 @@ def process_werewolf_night(state: GameState) -> dict[int, list[Player]]:
     
     result: dict[int, list[Player]] = {}
     
+    # 大狼が見る中央カードはどの大狼にも同じなので1回だけ作る
+    center_text = ", ".join(ROLE_LABELS[r] for r in state.center_cards)
+    
     for wolf in all_wolves:
         # 自分以外の人狼/大狼
         other_wolves = [w for w in all_wolves if w.user_id != wolf.user_id]
@@ -139,8 +147,6 @@ def process_werewolf_night(state: GameState) -> dict[int, list[Player]]:
         
         # 大狼は中央カードも確認
         if wolf.initial_role == Role.ALPHA_WOLF:
-            center_cards = state.center_cards
-            center_text = ", ".join(r.value for r in center_cards)
             result_text += f"\n中央カード: {center_text}"
         
         wolf.night_action = NightAction(
@@ -312,6 +318,7 @@ def process_thief_action(
     
     thief.current_role = new_thief_role
     target.current_role = old_thief_role
+    state.on_current_roles_changed()
     
     # 行動を記録
     thief.night_action = NightAction(
@@ -432,7 +439,7 @@ def register_vote(state: GameState, voter_id: int, target_id: int) -> bool:
     if voter.vote_target_id is not None:
         return False  # 既に投票済み
     
-    voter.vote_target_id = target_id
+    state.record_vote(voter, target_id)
     return True
 
 
@@ -441,28 +448,50 @@ def calculate_votes(state: GameState) -> dict[int, int]:
     投票を集計する。
     
     村長（MAYOR）の票は2票としてカウントする。
+    結果は投票か役職が変わるまでGameStateにキャッシュするので、変更しないこと。
     
     Returns:
         user_idをキー、得票数を値とする辞書
         -1 は「平和村」（誰も処刑しない）への投票を表す
     """
-    vote_counts: dict[int, int] = {p.user_id: 0 for p in state.players.values()}
+    if state._vote_tally_cache is not None:
+        return state._vote_tally_cache
+    
+    vote_counts: dict[int, int] = dict.fromkeys(state.players, 0)
     vote_counts[-1] = 0  # 平和村への投票
     
     for player in state.players.values():
-        if player.vote_target_id is not None:
-            # 村長は2票、それ以外は1票
-            vote_power = 2 if player.current_role == Role.MAYOR else 1
-            
-            if player.vote_target_id in vote_counts:
-                vote_counts[player.vote_target_id] += vote_power
-            elif player.vote_target_id == -1:
-                vote_counts[-1] += vote_power
+        target_id = player.vote_target_id
+        # 参加者か平和村への投票だけを数える（村長は2票、それ以外は1票）
+        if target_id is not None and target_id in vote_counts:
+            vote_counts[target_id] += 2 if player.current_role == Role.MAYOR else 1
     
+    state._vote_tally_cache = vote_counts
     return vote_counts
 
 
-def determine_execution(state: GameState) -> list[int]:
+def get_most_voted(vote_counts: dict[int, int]) -> tuple[int, list[int]]:
+    """
+    最多得票数と、その票数を得たID（平和村の -1 を含む）を1回の走査で求める。
+    
+    Returns:
+        (最多得票数, 最多得票のIDリスト)
+    """
+    max_votes = 0
+    most_voted: list[int] = []
+    for uid, count in vote_counts.items():
+        if count > max_votes:
+            max_votes = count
+            most_voted = [uid]
+        elif count == max_votes:
+            most_voted.append(uid)
+    return (max_votes, most_voted)
+
+
+def determine_execution(
+    state: GameState,
+    vote_counts: Optional[dict[int, int]] = None,
+) -> list[int]:
     """
     処刑対象を決定する（狩人の道連れは含まない）。
 
@@ -471,34 +500,35 @@ def determine_execution(state: GameState) -> list[int]:
 
     ※ 狩人の道連れは別途 add_hunter_target_to_execution() で追加する
 
+    Args:
+        state: ゲーム状態
+        vote_counts: 集計済みの得票数（省略時はここで集計する）
+
     Returns:
         処刑されるプレイヤーのUser IDリスト（0人以上）
     """
-    vote_counts = calculate_votes(state)
-
-    if not vote_counts:
-        return []
+    if vote_counts is None:
+        vote_counts = calculate_votes(state)
 
-    max_votes = max(vote_counts.values())
+    max_votes, max_voted = get_most_voted(vote_counts)
 
     if max_votes == 0:
         return []
 
-    # 最多得票者を取得
-    max_voted = [uid for uid, count in vote_counts.items() if count == max_votes]
-
     # 平和村（-1）を除外
     max_voted_players = [uid for uid in max_voted if uid != -1]
 
     # 平和村のみが最多得票の場合は誰も処刑しない
     if not max_voted_players:
         state.executed_player_ids = []
+        state.executed_players = []
         return []
 
     # 同票でも全員処刑（両吊り）
     executed = list(max_voted_players)
 
     state.executed_player_ids = executed
+    state.executed_players = [state.players[uid] for uid in executed]
     return executed
 
 
@@ -509,12 +539,7 @@ def get_executed_hunters(state: GameState) -> list[Player]:
     Returns:
         処刑対象の狩人のリスト
     """
-    hunters = []
-    for uid in state.executed_player_ids:
-        player = state.get_player(uid)
-        if player and player.current_role == Role.HUNTER:
-            hunters.append(player)
-    return hunters
+    return [p for p in state.executed_players if p.current_role == Role.HUNTER]
 
 
 def add_hunter_target_to_execution(state: GameState, target_id: int) -> bool:
@@ -536,6 +561,7 @@ def add_hunter_target_to_execution(state: GameState, target_id: int) -> bool:
         return False
 
     state.executed_player_ids.append(target_id)
+    state.executed_players.append(target)
     return True
 
 
@@ -545,14 +571,14 @@ def add_hunter_target_to_execution(state: GameState, target_id: int) -> bool:
 
 def is_wolf_role(role: Role) -> bool:
     """人狼系の役職かどうかを判定する。"""
-    return role in (Role.WEREWOLF, Role.ALPHA_WOLF)
+    return role in WOLF_ROLES
 
 
 def has_wolves_in_game(state: GameState) -> bool:
-    """場に人狼/大狼がいるかどうかを判定する。"""
-    werewolves_in_game = state.get_players_by_role(Role.WEREWOLF, use_current=True)
-    alpha_wolves_in_game = state.get_players_by_role(Role.ALPHA_WOLF, use_current=True)
-    return bool(werewolves_in_game or alpha_wolves_in_game)
+    """場に人狼/大狼がいるかどうかを判定する（役職が変わるまで結果を使い回す）。"""
+    if state._wolves_exist_cache is None:
+        state._wolves_exist_cache = any(p.current_role in WOLF_ROLES for p in state.players.values())
+    return state._wolves_exist_cache
 
 
 def determine_winner(state: GameState) -> list[Team]:
@@ -576,46 +602,59 @@ def determine_winner(state: GameState) -> list[Team]:
     """
     executed_ids = state.executed_player_ids
 
-    # 処刑されたプレイヤーの情報を取得
-    executed_players = [state.get_player(uid) for uid in executed_ids]
-    executed_players = [p for p in executed_players if p is not None]
-
-    # 処刑されたプレイヤーの最終役職を取得
-    executed_roles = [p.current_role for p in executed_players]
-
-    # 1. 吊り人が処刑された場合 → 吊り人のみ勝利
-    if Role.TANNER in executed_roles:
-        state.winners = [Team.TANNER]
-        return [Team.TANNER]
-
-    # 場に人狼がいるかチェック
-    wolves_exist = has_wolves_in_game(state)
-
-    # 誰も処刑されなかった場合の特殊処理
-    if not executed_ids:
+    # 処刑されたプレイヤーの最終役職に吊り人・人狼/大狼がいるかを1回の走査で調べる
+    tanner_executed = False
+    wolf_executed = False
+    for player in state.executed_players:
+        role = player.current_role
+        if role == Role.TANNER:
+            tanner_executed = True
+        elif role in WOLF_ROLES:
+            wolf_executed = True
+
+    # 場に人狼がいるか（吊り人が処刑された場合は判定に使わない）
+    wolves_exist = not tanner_executed and has_wolves_in_game(state)
+
+    winners: list[Team]
+    if tanner_executed:
+        # 1. 吊り人が処刑された場合 → 吊り人のみ勝利
+        winners = [Team.TANNER]
+    elif not executed_ids:
+        # 誰も処刑されなかった場合の特殊処理
         if wolves_exist:
             # 人狼がいるのに誰も処刑されなかった → 人狼勝利
-            state.winners = [Team.WEREWOLF]
-            return [Team.WEREWOLF]
+            winners = [Team.WEREWOLF]
         else:
             # 平和村で誰も処刑されない → 全員勝利
-            state.winners = [Team.VILLAGE, Team.WEREWOLF, Team.TANNER]
-            return [Team.VILLAGE, Team.WEREWOLF, Team.TANNER]
-
-    # 2. 人狼/大狼が処刑された場合 → 村人陣営勝利
-    if any(is_wolf_role(role) for role in executed_roles):
-        state.winners = [Team.VILLAGE]
-        return [Team.VILLAGE]
-
-    # 3. 人狼/大狼が処刑されなかった場合
-    if wolves_exist:
-        # 人狼がいる → 人狼陣営勝利
-        state.winners = [Team.WEREWOLF]
-        return [Team.WEREWOLF]
+            winners = [Team.VILLAGE, Team.WEREWOLF, Team.TANNER]
+    elif wolf_executed:
+        # 2. 人狼/大狼が処刑された場合 → 村人陣営勝利
+        winners = [Team.VILLAGE]
+    elif wolves_exist:
+        # 3. 人狼/大狼が処刑されず、人狼がいる → 人狼陣営勝利
+        winners = [Team.WEREWOLF]
     else:
         # 平和村で誰かが処刑された → 処刑された人の勝利
-        state.winners = [Team.TANNER]  # 特殊勝利として吊り人陣営を使用
-        return [Team.TANNER]
+        winners = [Team.TANNER]  # 特殊勝利として吊り人陣営を使用
+
+    state.winners = winners
+    return winners
+
+
+# 勝者メッセージ: (村人陣営, 人狼陣営, 吊り人陣営が勝者か, 場に人狼/大狼がいるか) -> メッセージ
+# 名前を含むメッセージ（吊り人陣営のみの勝利）と、狂人の有無で変わる平和村の村人勝利は
+# get_winner_message で個別に作る
+ALL_WIN_MESSAGE = "🎉 **全員の勝利！** 人狼がいない平和村で誰も処刑されませんでした！"
+VILLAGE_WIN_MESSAGE = "🏘️ **村人陣営の勝利！** 人狼を処刑しました！"
+PEACEFUL_VILLAGE_WIN_MESSAGE = "🏘️ **村人陣営の勝利！** 人狼がいない平和村でした！"
+WEREWOLF_WIN_MESSAGE = "🐺 **人狼陣営の勝利！** 人狼は処刑を免れました！"
+WINNER_MESSAGES: dict[tuple[bool, bool, bool, bool], str] = {
+    (True, True, True, False): ALL_WIN_MESSAGE,
+    (True, True, True, True): ALL_WIN_MESSAGE,
+    (True, False, False, True): VILLAGE_WIN_MESSAGE,
+    (False, True, False, False): WEREWOLF_WIN_MESSAGE,
+    (False, True, False, True): WEREWOLF_WIN_MESSAGE,
+}
 
 
 def get_winner_message(state: GameState) -> str:
@@ -625,105 +664,81 @@ def get_winner_message(state: GameState) -> str:
     if not winners:
         return "勝者なし"
 
-    # 平和村で全員勝利（全陣営が勝者）
-    if len(winners) == 3 and Team.VILLAGE in winners and Team.WEREWOLF in winners and Team.TANNER in winners:
-        return "🎉 **全員の勝利！** 人狼がいない平和村で誰も処刑されませんでした！"
-
-    # 平和村で処刑者勝利（吊り人陣営のみだが、吊り人が処刑されていない）
-    if winners == [Team.TANNER]:
-        wolves_exist = has_wolves_in_game(state)
-        if not wolves_exist:
-            # 平和村で誰かが処刑された → 処刑された人の勝利
-            executed_players = [state.get_player(uid) for uid in state.executed_player_ids]
-            executed_players = [p for p in executed_players if p is not None]
-            if executed_players:
-                names = "、".join(p.username for p in executed_players)
-                return f"🎯 **{names} の勝利！** 人狼がいない平和村で処刑されました！"
-        # 通常の吊り人勝利（吊り人が処刑された場合）
-        tanner_players = [
-            p for p in state.players.values()
-            if p.current_role == Role.TANNER and p.user_id in state.executed_player_ids
-        ]
-        if tanner_players:
-            return f"🎭 **吊り人（{tanner_players[0].username}）の単独勝利！**"
-        return "🎭 **吊り人陣営の勝利！**"
-
-    if Team.VILLAGE in winners:
-        # 人狼がいるかチェック（平和村判定）
-        wolves_exist = has_wolves_in_game(state)
-        if not wolves_exist:
-            # 平和村の場合、狂人も勝者に含める
-            madmen = state.get_players_by_role(Role.MADMAN, use_current=True)
-            if madmen:
-                return "🏘️ **村人陣営の勝利！** 人狼がいない平和村でした！\n🤪 狂人も村人陣営として勝利！"
-            return "🏘️ **村人陣営の勝利！** 人狼がいない平和村でした！"
-        return "🏘️ **村人陣営の勝利！** 人狼を処刑しました！"
-
-    if Team.WEREWOLF in winners:
-        return "🐺 **人狼陣営の勝利！** 人狼は処刑を免れました！"
-
-    return "結果不明"
+    wolves_exist = has_wolves_in_game(state)
+    key = (Team.VILLAGE in winners, Team.WEREWOLF in winners, Team.TANNER in winners, wolves_exist)
+
+    # 吊り人陣営のみの勝利（吊り人の処刑、または平和村で処刑された人の勝利）
+    if key[:3] == (False, False, True):
+        return get_tanner_winner_message(state, wolves_exist)
+
+    # 平和村での村人陣営の勝利では、狂人も勝者に含める
+    if key == (True, False, False, False):
+        if state.get_players_by_role(Role.MADMAN, use_current=True):
+            return PEACEFUL_VILLAGE_WIN_MESSAGE + "\n🤪 狂人も村人陣営として勝利！"
+        return PEACEFUL_VILLAGE_WIN_MESSAGE
+
+    return WINNER_MESSAGES.get(key, "結果不明")
+
+
+def get_tanner_winner_message(state: GameState, wolves_exist: bool) -> str:
+    """吊り人陣営のみが勝った場合の勝者メッセージを生成する。"""
+    if not wolves_exist:
+        # 平和村で誰かが処刑された → 処刑された人の勝利
+        if state.executed_players:
+            names = "、".join(p.username for p in state.executed_players)
+            return f"🎯 **{names} の勝利！** 人狼がいない平和村で処刑されました！"
+    # 通常の吊り人勝利（吊り人が処刑された場合）
+    tanner_players = [p for p in state.executed_players if p.current_role == Role.TANNER]
+    if tanner_players:
+        return f"🎭 **吊り人（{tanner_players[0].username}）の単独勝利！**"
+    return "🎭 **吊り人陣営の勝利！**"
+
+
+def format_final_role_line(player: Player) -> str:
+    """最終役職一覧の1行を作る（役職が変わった人は初期役職も表示）。"""
+    initial = ROLE_LABELS[player.initial_role]
+    current = ROLE_LABELS[player.current_role]
+    return f"• {player.username}: {initial + ' → ' if initial != current else ''}**{current}**"
 
 
 def get_final_roles_message(state: GameState) -> str:
     """最終役職一覧のメッセージを生成する。"""
-    lines: list[str] = []
-    
-    # プレイヤーの役職
-    lines.append("**【プレイヤー】**")
-    for player in state.players.values():
-        initial = player.initial_role.value
-        current = player.current_role.value
-        
-        if initial != current:
-            lines.append(f"• {player.username}: {initial} → **{current}**")
-        else:
-            lines.append(f"• {player.username}: **{current}**")
-    
-    # 中央カード
-    lines.append("")
-    lines.append("**【中央カード】**")
-    for i, role in enumerate(state.center_cards, 1):
-        lines.append(f"• カード{i}: **{role.value}**")
-    
-    return "\n".join(lines)
+    player_lines = "\n".join(map(format_final_role_line, state.players.values()))
+    center_lines = "\n".join(
+        f"• カード{i}: **{ROLE_LABELS[role]}**" for i, role in enumerate(state.center_cards, 1)
+    )
+    return f"**【プレイヤー】**\n{player_lines}\n\n**【中央カード】**\n{center_lines}"
 
 
 def get_execution_message(state: GameState) -> str:
     """処刑結果のメッセージを生成する。"""
     executed_ids = state.executed_player_ids
+    _, max_voted = get_most_voted(calculate_votes(state))
     
     if not executed_ids:
         # 平和村が選ばれたかを判定
-        vote_counts = calculate_votes(state)
-        max_votes = max(vote_counts.values()) if vote_counts else 0
-        max_voted = [uid for uid, count in vote_counts.items() if count == max_votes]
-        
         if -1 in max_voted:
             return "🕊️ **平和村が選ばれました！** 誰も処刑されませんでした。"
         return "⚖️ **誰も処刑されませんでした。**"
     
-    executed_players = [state.get_player(uid) for uid in executed_ids]
-    executed_players = [p for p in executed_players if p is not None]
+    executed_players = state.executed_players
     
     if not executed_players:
         return "処刑結果を取得できませんでした。"
     
-    # 狩人の道連れがあるかチェック
-    vote_counts = calculate_votes(state)
-    max_votes = max(vote_counts.values()) if vote_counts else 0
-    max_voted = [uid for uid, count in vote_counts.items() if count == max_votes and uid != -1]
-    
-    # 投票で処刑された人と道連れの人を分ける
-    voted_executed = [p for p in executed_players if p.user_id in max_voted]
-    dragged_executed = [p for p in executed_players if p.user_id not in max_voted]
+    # 投票で処刑された人と道連れの人を分ける（最多得票者以外の処刑は狩人の道連れ）
+    max_voted_ids = set(max_voted)
+    voted_executed: list[Player] = []
+    dragged_executed: list[Player] = []
+    for p in executed_players:
+        (voted_executed if p.user_id in max_voted_ids else dragged_executed).append(p)
     
     result_lines = []
     
     # 投票による処刑
     if voted_executed:
         names = ", ".join(p.username for p in voted_executed)
-        roles = ", ".join(p.current_role.value for p in voted_executed)
+        roles = ", ".join(ROLE_LABELS[p.current_role] for p in voted_executed)
         
         if len(voted_executed) > 1:
             result_lines.append(f"⚔️ **両吊り！** {names} が処刑されました。\n役職: **{roles}**")
@@ -733,7 +748,7 @@ def get_execution_message(state: GameState) -> str:
     # 狩人の道連れ
     if dragged_executed:
         names = ", ".join(p.username for p in dragged_executed)
-        roles = ", ".join(p.current_role.value for p in dragged_executed)
+        roles = ", ".join(ROLE_LABELS[p.current_role] for p in dragged_executed)
         result_lines.append(f"🏹 **道連れ！** {names} も処刑されました。\n役職: **{roles}**")
     
     return "\n\n".join(result_lines)
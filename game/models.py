@@ -4,10 +4,15 @@
 役職、プレイヤー状態、ゲーム状態などを定義する。
 """
 
+import random
+import re
+import sys
+from collections import deque
 from enum import Enum, auto
+from itertools import islice
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
 
 class Role(Enum):
@@ -59,6 +64,13 @@ ROLE_TO_TEAM: dict[Role, Team] = {
 }
 
 
+# 役職の表示名（メッセージ作成時に Enum の value を毎回引かないように）
+ROLE_LABELS: dict[Role, str] = {role: role.value for role in Role}
+
+# 人狼系の役職（人狼・大狼）
+WOLF_ROLES: frozenset[Role] = frozenset((Role.WEREWOLF, Role.ALPHA_WOLF))
+
+
 def get_team(role: Role) -> Team:
     """役職から陣営を取得する。"""
     return ROLE_TO_TEAM[role]
@@ -89,7 +101,7 @@ class NightActionType(Enum):
     NO_ACTION = auto()          # 行動なし
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NightAction:
     """
     夜の行動を記録するデータクラス。
@@ -99,7 +111,18 @@ class NightAction:
     result: Optional[str] = None            # 行動の結果（表示用テキスト）
 
 
-@dataclass
+# 保持する履歴の上限（長いゲームでもメモリが増え続けないように）
+MAX_MY_STATEMENTS = 64        # プレイヤーごとの自分の発言
+MAX_DISCUSSION_HISTORY = 256  # ゲーム全体の議論履歴
+MAX_WOLF_STATEMENTS = 16      # 人狼（初期役職）の発言（LLM人狼の協調用）
+
+
+def tail(items: deque, count: int) -> list:
+    """dequeの末尾count件をリストで返す（dequeはスライスできないため）。"""
+    return list(islice(items, max(0, len(items) - count), None))
+
+
+@dataclass(slots=True)
 class Player:
     """
     プレイヤー情報を管理するデータクラス。
@@ -112,7 +135,7 @@ class Player:
     has_acted: bool = False                 # 夜の行動を完了したか
     vote_target_id: Optional[int] = None    # 投票先のUser ID
     is_llm: bool = False                    # LLMプレイヤーかどうか
-    my_statements: list[str] = field(default_factory=list)  # 自分の発言履歴（LLM用）
+    my_statements: deque[str] = field(default_factory=lambda: deque(maxlen=MAX_MY_STATEMENTS))  # 自分の発言履歴（LLM用）
     personality: Optional[str] = None       # 性格設定（LLM用）
     speech_style: Optional[str] = None      # 口調設定（LLM用）
     emoji: Optional[str] = None             # 絵文字（LLM用）
@@ -126,9 +149,46 @@ class Player:
     def initial_team(self) -> Team:
         """初期役職に基づく陣営を返す。"""
         return get_team(self.initial_role)
+    
+    def reset(self) -> None:
+        """再戦用に役職・行動・投票・発言履歴をリセットする（LLMの人格設定は保持）。"""
+        self.initial_role = Role.VILLAGER  # 仮の役職
+        self.current_role = Role.VILLAGER
+        self.night_action = None
+        self.has_acted = False
+        self.vote_target_id = None
+        self.my_statements.clear()
+    
+    def recent_statements(self, count: int) -> list[str]:
+        """自分の最新count件の発言を返す。"""
+        return tail(self.my_statements, count)
+
+
+# 名前の正規表現と、一致した名前 -> プレイヤー
+NameMatcher = tuple[Optional[re.Pattern[str]], dict[str, Player]]
+
+
+def build_name_matcher(players: Iterable[Player]) -> NameMatcher:
+    """プレイヤー名のどれかに一致する正規表現を作る（同名は先のプレイヤーを優先）。"""
+    by_name: dict[str, Player] = {}
+    for p in players:
+        by_name.setdefault(p.username, p)
+    # 長い名前を先に並べ、同じ位置から始まる短い名前より優先する
+    names = sorted(by_name, key=len, reverse=True)
+    pattern = re.compile("|".join(map(re.escape, names))) if names else None
+    return (pattern, by_name)
 
 
-@dataclass
+def match_name(matcher: NameMatcher, text: str) -> Optional[Player]:
+    """テキスト内で最初に名前が出てくるプレイヤーを返す。"""
+    pattern, by_name = matcher
+    if pattern is None:
+        return None
+    match = pattern.search(text)
+    return by_name[match.group(0)] if match else None
+
+
+@dataclass(slots=True)
 class GameState:
     """
     ゲーム全体の状態を管理するデータクラス。
@@ -138,12 +198,21 @@ class GameState:
     channel_id: int                         # Discord チャンネル ID
     host_id: int                            # ホスト（ゲーム開始者）のUser ID
     started_at: datetime = field(default_factory=datetime.now)
+    last_activity: datetime = field(default_factory=datetime.now)  # 最後に操作があった日時
     phase: GamePhase = GamePhase.WAITING
     players: dict[int, Player] = field(default_factory=dict)  # user_id -> Player
     center_cards: list[Role] = field(default_factory=list)    # 中央カード（2枚）
     
     # カスタム役職構成（Noneの場合はデフォルトを使用）
     custom_role_config: Optional[list[Role]] = None
+    # カスタム役職構成の版数（set_custom_role_configで変更するたびに増える）
+    role_config_version: int = 0
+    # LLM用の役職構成テキスト（ゲーム開始時にリセットし、初回利用時に作成）
+    role_composition_text: Optional[str] = None
+    # 役職配布とLLMのランダム行動に使う乱数生成器（シードを与えれば再現できる）
+    rng: random.Random = field(default_factory=random.Random, repr=False)
+    # LLM用のシステムプロンプト（役職構成テキストと同じタイミングでリセット）: 役職 -> プロンプト
+    system_prompts: dict[Role, str] = field(default_factory=dict, repr=False)
     
     # 夜フェーズの進行管理
     current_night_role: Optional[Role] = None  # 現在行動中の役職
@@ -152,12 +221,46 @@ class GameState:
     
     # 投票結果
     executed_player_ids: list[int] = field(default_factory=list)  # 処刑されたプレイヤー
+    executed_players: list[Player] = field(default_factory=list)  # 処刑されたプレイヤー（executed_player_idsと同じ順）
     
     # 勝敗結果
     winners: list[Team] = field(default_factory=list)
     
+    # LLM狩人が投票時に決めておいた道連れ対象: 狩人のuser_id -> 対象のuser_id
+    hunter_revenge_plans: dict[int, int] = field(default_factory=dict)
+    
     # 議論履歴（投票判断に活用）
-    discussion_history: list[tuple[str, str]] = field(default_factory=list)  # (発言者名, 発言内容)
+    discussion_history: deque[tuple[str, str]] = field(
+        default_factory=lambda: deque(maxlen=MAX_DISCUSSION_HISTORY)
+    )  # (発言者名, 発言内容)
+    discussion_message_count: int = 0  # 議論の発言総数（上限で捨てた分も含む）
+    wolf_statements: deque[tuple[str, str]] = field(
+        default_factory=lambda: deque(maxlen=MAX_WOLF_STATEMENTS)
+    )  # 人狼・大狼の発言だけを抜き出したもの (発言者名, 発言内容)
+    # プロンプト用に整形済みの議論履歴の各行（"発言者名: 発言内容"、discussion_historyと同じ上限）
+    _discussion_lines: deque[str] = field(
+        default_factory=lambda: deque(maxlen=MAX_DISCUSSION_HISTORY), repr=False
+    )
+    # プロンプト用の議論テキスト（発言が追加されるまで使い回す）: limit -> テキスト
+    _discussion_text_cache: dict[int, str] = field(default_factory=dict, repr=False)
+    
+    # 名前検索用インデックス（参加者の増減時に更新）
+    _username_index: dict[str, int] = field(default_factory=dict, repr=False)  # 小文字の表示名 -> user_id
+    _player_search_cache: Optional[tuple[tuple[str, Player], ...]] = field(default=None, repr=False)
+    _player_list_cache: Optional[tuple[Player, ...]] = field(default=None, repr=False)
+    _player_names_display: Optional[str] = field(default=None, repr=False)
+    _players_display_cache: Optional[str] = field(default=None, repr=False)
+    _llm_mention_cache: Optional[NameMatcher] = field(default=None, repr=False)  # LLMプレイヤーの名前
+    _voted_count: int = field(default=0, repr=False)  # 投票済みの人数（record_voteで更新）
+    _vote_tally_cache: Optional[dict[int, int]] = field(default=None, repr=False)  # 集計済みの得票数（投票・役職の変更で破棄）
+    _llm_players_cache: Optional[tuple[Player, ...]] = field(default=None, repr=False)
+    _human_players_cache: Optional[tuple[Player, ...]] = field(default=None, repr=False)
+    _other_players_cache: dict[int, tuple[Player, ...]] = field(default_factory=dict, repr=False)  # user_id -> 自分以外のプレイヤー
+    _other_player_names_cache: dict[int, str] = field(default_factory=dict, repr=False)  # user_id -> 自分以外の名前（カンマ区切り）
+    _players_by_initial_role: Optional[dict[Role, tuple[Player, ...]]] = field(default=None, repr=False)  # 初期役職 -> プレイヤー
+    _other_player_matchers: dict[int, NameMatcher] = field(default_factory=dict, repr=False)  # user_id -> 自分以外の名前
+    _players_by_current_role: Optional[dict[Role, tuple[Player, ...]]] = field(default=None, repr=False)  # 現在の役職 -> プレイヤー
+    _wolves_exist_cache: Optional[bool] = field(default=None, repr=False)  # 現在の役職に人狼/大狼がいるか
     
     @property
     def player_count(self) -> int:
@@ -165,14 +268,134 @@ class GameState:
         return len(self.players)
     
     @property
-    def player_list(self) -> list[Player]:
-        """プレイヤーのリストを返す。"""
-        return list(self.players.values())
+    def player_list(self) -> tuple[Player, ...]:
+        """プレイヤーの一覧を返す（参加者が変わるまで同じタプルを使い回す）。"""
+        if self._player_list_cache is None:
+            self._player_list_cache = tuple(self.players.values())
+        return self._player_list_cache
     
     def get_player(self, user_id: int) -> Optional[Player]:
         """User IDからプレイヤーを取得する。"""
         return self.players.get(user_id)
     
+    def get_other_players(self, user_id: int) -> tuple[Player, ...]:
+        """指定したプレイヤー以外のプレイヤー一覧を返す（参加者が変わるまで使い回す）。"""
+        others = self._other_players_cache.get(user_id)
+        if others is None:
+            others = tuple(p for p in self.player_list if p.user_id != user_id)
+            self._other_players_cache[user_id] = others
+        return others
+    
+    def get_other_player_names(self, user_id: int) -> str:
+        """指定したプレイヤー以外の名前をカンマ区切りで返す（LLMプロンプト用）。"""
+        names = self._other_player_names_cache.get(user_id)
+        if names is None:
+            names = ", ".join(p.username for p in self.get_other_players(user_id))
+            self._other_player_names_cache[user_id] = names
+        return names
+    
+    def find_user_id_by_name(self, name: str) -> Optional[int]:
+        """表示名（大文字小文字を区別しない完全一致）からUser IDを取得する。"""
+        return self._username_index.get(name.lower())
+    
+    def find_player_by_name(self, name: str) -> Optional[Player]:
+        """
+        表示名からプレイヤーを検索する（DMコマンドの対象指定用）。
+        
+        大文字小文字を区別せず、完全一致を優先し、なければ部分一致で最初のプレイヤーを返す。
+        """
+        user_id = self.find_user_id_by_name(name)
+        if user_id is not None:
+            return self.players.get(user_id)
+        name_lower = name.lower()
+        for username_lower, player in self.player_search_names:
+            if name_lower in username_lower:
+                return player
+        return None
+    
+    def resolve_vote_target(self, raw: str) -> Optional[Player]:
+        """
+        投票コマンドの入力からプレイヤーを取得する。
+        
+        オートコンプリートが送るUser IDを先に試し、
+        該当しなければ表示名（大文字小文字を区別しない）で検索する。
+        """
+        if raw.lstrip("-").isdigit():
+            player = self.players.get(int(raw))
+            if player is not None:
+                return player
+        user_id = self.find_user_id_by_name(raw)
+        if user_id is None:
+            return None
+        return self.players.get(user_id)
+    
+    @property
+    def player_search_names(self) -> tuple[tuple[str, Player], ...]:
+        """(小文字の表示名, プレイヤー) のタプルを返す（オートコンプリート用）。"""
+        if self._player_search_cache is None:
+            self._player_search_cache = tuple(
+                (p.username.lower(), p) for p in self.players.values()
+            )
+        return self._player_search_cache
+    
+    @property
+    def player_names_display(self) -> str:
+        """参加者の表示名をカンマ区切りで返す（表示用）。"""
+        if self._player_names_display is None:
+            self._player_names_display = ", ".join(p.username for p in self.players.values())
+        return self._player_names_display
+    
+    @property
+    def players_display(self) -> str:
+        """参加者一覧を1行1人の箇条書きで返す（ホストには印を付ける）。"""
+        if self._players_display_cache is None:
+            self._players_display_cache = "\n".join(
+                f"• {p.username}" + (" (ホスト)" if p.user_id == self.host_id else "")
+                for p in self.players.values()
+            )
+        return self._players_display_cache
+    
+    def find_mentioned_llm(self, content: str) -> Optional[Player]:
+        """メッセージ内で最初に名前が出てくるLLMプレイヤーを返す。"""
+        if self._llm_mention_cache is None:
+            self._llm_mention_cache = build_name_matcher(self.get_llm_players())
+        return match_name(self._llm_mention_cache, content)
+    
+    def find_other_player_in(self, user_id: int, text: str) -> Optional[Player]:
+        """テキスト内で最初に名前が出てくる、指定したプレイヤー以外のプレイヤーを返す（LLMの応答解析用）。"""
+        matcher = self._other_player_matchers.get(user_id)
+        if matcher is None:
+            matcher = build_name_matcher(self.get_other_players(user_id))
+            self._other_player_matchers[user_id] = matcher
+        return match_name(matcher, text)
+    
+    def _on_roster_changed(self) -> None:
+        """参加者の増減に合わせて名前インデックスと表示用キャッシュを作り直す。"""
+        self._username_index.clear()
+        for p in self.players.values():
+            # 同名の場合は先に参加したプレイヤーを優先
+            self._username_index.setdefault(p.username.lower(), p.user_id)
+        self._player_list_cache = None
+        self._player_search_cache = None
+        self._player_names_display = None
+        self._players_display_cache = None
+        self._other_players_cache.clear()
+        self._other_player_names_cache.clear()
+        self._other_player_matchers.clear()
+        self._llm_mention_cache = None
+        self._llm_players_cache = None
+        self._human_players_cache = None
+        self._players_by_initial_role = None
+        self._players_by_current_role = None
+        self._wolves_exist_cache = None
+        self._vote_tally_cache = None
+    
+    def on_current_roles_changed(self) -> None:
+        """役職の配布・交換で現在の役職が変わったときに、役職から求めたキャッシュを捨てる。"""
+        self._players_by_current_role = None
+        self._wolves_exist_cache = None
+        self._vote_tally_cache = None  # 村長の票の重みが変わる
+    
     def add_player(self, user_id: int, username: str, is_llm: bool = False) -> bool:
         """
         プレイヤーを追加する。
@@ -195,6 +418,7 @@ class GameState:
             current_role=Role.VILLAGER,
             is_llm=is_llm,
         )
+        self._on_roster_changed()
         return True
     
     def remove_player(self, user_id: int) -> bool:
@@ -206,68 +430,157 @@ class GameState:
         """
         if user_id not in self.players:
             return False
-        del self.players[user_id]
+        if self.players.pop(user_id).vote_target_id is not None:
+            self._voted_count -= 1
+        self._on_roster_changed()
         return True
     
-    def get_players_by_role(self, role: Role, use_current: bool = True) -> list[Player]:
+    def get_players_by_role(self, role: Role, use_current: bool = True) -> tuple[Player, ...]:
         """
-        指定した役職のプレイヤーリストを返す。
+        指定した役職のプレイヤーを返す。
         
         Args:
             role: 検索する役職
             use_current: Trueなら現在の役職、Falseなら初期役職で検索
         """
-        if use_current:
-            return [p for p in self.players.values() if p.current_role == role]
-        return [p for p in self.players.values() if p.initial_role == role]
+        if not use_current:
+            return self.get_players_by_initial_role(role)
+        if self._players_by_current_role is None:
+            by_role: dict[Role, list[Player]] = {}
+            for p in self.players.values():
+                by_role.setdefault(p.current_role, []).append(p)
+            self._players_by_current_role = {r: tuple(ps) for r, ps in by_role.items()}
+        return self._players_by_current_role.get(role, ())
+    
+    def get_players_by_initial_role(self, role: Role) -> tuple[Player, ...]:
+        """初期役職で検索（夜フェーズ用）。役職配布時に作った索引を引く。"""
+        if self._players_by_initial_role is None:
+            self.index_initial_roles()
+        return self._players_by_initial_role.get(role, ())
+    
+    def index_initial_roles(self) -> None:
+        """初期役職 -> プレイヤーの索引を作り直す（役職配布後に呼ぶ）。"""
+        by_role: dict[Role, list[Player]] = {}
+        for p in self.players.values():
+            by_role.setdefault(p.initial_role, []).append(p)
+        self._players_by_initial_role = {role: tuple(ps) for role, ps in by_role.items()}
     
-    def get_players_by_initial_role(self, role: Role) -> list[Player]:
-        """初期役職で検索（夜フェーズ用）。"""
-        return self.get_players_by_role(role, use_current=False)
+    def record_vote(self, player: Player, target_id: int) -> None:
+        """投票先を記録し、投票済み人数を更新する（-1は平和村）。"""
+        if player.vote_target_id is None:
+            self._voted_count += 1
+        player.vote_target_id = target_id
+        self._vote_tally_cache = None
     
     def all_voted(self) -> bool:
         """全員が投票済みかどうかを返す。"""
-        return all(p.vote_target_id is not None for p in self.players.values())
+        return self._voted_count >= len(self.players)
     
     def voted_count(self) -> int:
         """投票済みの人数を返す。"""
-        return sum(1 for p in self.players.values() if p.vote_target_id is not None)
+        return self._voted_count
     
-    def reset(self) -> None:
-        """ゲーム状態を完全にリセットする（次のゲームの準備）。"""
+    def reset_progress(self) -> None:
+        """フェーズ・カード・夜の進行・投票結果・議論履歴をリセットする（参加者は保持）。"""
         self.phase = GamePhase.WAITING
-        self.players.clear()
         self.center_cards.clear()
-        self.custom_role_config = None  # カスタム役職構成もリセット
         self.current_night_role = None
         self.night_action_order.clear()
         self.night_action_index = 0
+        self._voted_count = 0  # プレイヤーの投票先はPlayer.reset()でリセットする
+        self.role_composition_text = None
+        self.system_prompts.clear()
+        self._players_by_initial_role = None  # 再戦時は役職を配り直す
+        self.on_current_roles_changed()
         self.executed_player_ids.clear()
+        self.executed_players.clear()
         self.winners.clear()
-        self.discussion_history.clear()  # 議論履歴もリセット
+        self.hunter_revenge_plans.clear()
+        self.discussion_history.clear()
+        self._discussion_lines.clear()
+        self.discussion_message_count = 0
+        self.wolf_statements.clear()
+        self._discussion_text_cache.clear()
+    
+    def set_custom_role_config(self, roles: Optional[list[Role]]) -> None:
+        """カスタム役職構成を設定し、版数を進める（Noneでデフォルトに戻す）。"""
+        self.custom_role_config = roles
+        self.role_config_version += 1
+    
+    def reset(self) -> None:
+        """ゲーム状態を完全にリセットする（次のゲームの準備）。"""
+        self.players.clear()
+        self._on_roster_changed()
+        self.reset_progress()
+        self.set_custom_role_config(None)  # カスタム役職構成もリセット
         self.started_at = datetime.now()
+        self.last_activity = self.started_at
+    
+    def touch(self) -> None:
+        """最終操作日時を更新する（放置ゲームの掃除判定に使う）。"""
+        self.last_activity = datetime.now()
     
     def add_discussion_message(self, speaker_name: str, message: str) -> None:
-        """議論履歴にメッセージを追加する。"""
-        self.discussion_history.append((speaker_name, message))
+        """議論履歴にメッセージを追加する（発言者名は何度も現れるのでinternする）。"""
+        entry = (sys.intern(speaker_name), message)
+        self.discussion_history.append(entry)
+        self._discussion_lines.append(f"{entry[0]}: {message}")
+        self.discussion_message_count += 1
+        # 人狼の発言は別にも残し、LLM人狼が仲間の発言を履歴から探さずに済むようにする
+        speaker_id = self._username_index.get(speaker_name.lower())
+        speaker = self.players.get(speaker_id) if speaker_id is not None else None
+        if speaker is not None and speaker.initial_role in WOLF_ROLES:
+            self.wolf_statements.append(entry)
+        self._discussion_text_cache.clear()
+        self.touch()
     
     def get_discussion_history_text(self, limit: int = 20) -> str:
-        """議論履歴をテキスト形式で取得する（最新limit件）。"""
+        """
+        議論履歴をテキスト形式で取得する（最新limit件）。
+        
+        それより古い発言は件数だけを示す。各行は発言の追加時に整形しておき、
+        結果は次の発言が追加されるまでキャッシュするので、同時に発言を生成する
+        LLM同士で共有される。
+        """
         if not self.discussion_history:
             return "（まだ発言がありません）"
-        recent = self.discussion_history[-limit:]
-        return "\n".join(f"{name}: {msg}" for name, msg in recent)
+        text = self._discussion_text_cache.get(limit)
+        if text is None:
+            recent = tail(self._discussion_lines, limit)
+            text = "\n".join(recent)
+            omitted = self.discussion_message_count - len(recent)
+            if omitted > 0:
+                text = f"（これより前の {omitted}件 の発言は省略）\n" + text
+            self._discussion_text_cache[limit] = text
+        return text
+    
+    def recent_discussion(self, limit: int) -> list[tuple[str, str]]:
+        """最新limit件の議論履歴を返す。"""
+        return tail(self.discussion_history, limit)
+    
+    def _partition_players(self) -> None:
+        """プレイヤーをLLMと人間に1回の走査で振り分けてキャッシュする。"""
+        llm_players: list[Player] = []
+        human_players: list[Player] = []
+        for p in self.players.values():
+            (llm_players if p.is_llm else human_players).append(p)
+        self._llm_players_cache = tuple(llm_players)
+        self._human_players_cache = tuple(human_players)
     
-    def get_llm_players(self) -> list[Player]:
-        """LLMプレイヤーのリストを返す。"""
-        return [p for p in self.players.values() if p.is_llm]
+    def get_llm_players(self) -> tuple[Player, ...]:
+        """LLMプレイヤーの一覧を返す（参加者が変わるまで同じタプルを使い回す）。"""
+        if self._llm_players_cache is None:
+            self._partition_players()
+        return self._llm_players_cache
     
-    def get_human_players(self) -> list[Player]:
-        """人間プレイヤーのリストを返す。"""
-        return [p for p in self.players.values() if not p.is_llm]
+    def get_human_players(self) -> tuple[Player, ...]:
+        """人間プレイヤーの一覧を返す（参加者が変わるまで同じタプルを使い回す）。"""
+        if self._human_players_cache is None:
+            self._partition_players()
+        return self._human_players_cache
     
     @property
     def llm_player_count(self) -> int:
         """LLMプレイヤー数を返す。"""
-        return sum(1 for p in self.players.values() if p.is_llm)
+        return len(self.get_llm_players())
 